@@ -0,0 +1,125 @@
+"""
+Connectivity check, fully offline.
+
+Drives ConnectivityMonitor and DownloadQueue against a local stand-in
+server that can be switched off and on: a download fails while it is off,
+the monitor goes offline and probes with growing gaps, queued jobs wait,
+and everything resumes once the server answers again. Run from the repo root:
+
+    python benchmarks/connectivity.py
+
+Exits non-zero if any step does not happen.
+"""
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from downloader_net import ConnectivityMonitor, get_session  # noqa: E402
+from downloader_queue import DownloadQueue  # noqa: E402
+
+
+class StandInServer:
+    """/generate_204 and /media on 127.0.0.1; while down, every connection is dropped unanswered."""
+
+    def __init__(self):
+        self.up = False
+        self.probes = []   # times of probe requests, answered or not
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                server._handle(self)
+
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _handle(self, handler):
+        if handler.path == "/generate_204":
+            self.probes.append(time.monotonic())
+        if not self.up:
+            handler.close_connection = True
+            return  # nothing written: the client sees the connection drop
+        body = b"" if handler.path == "/generate_204" else b"x" * 1024
+        handler.send_response(204 if not body else 200)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        if handler.command == "GET":
+            handler.wfile.write(body)
+
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def main():
+    server = StandInServer()
+    monitor = ConnectivityMonitor(f"{server.base_url}/generate_204", min_backoff=0.2, max_backoff=1.0)
+    transitions = []
+    monitor.add_listener(transitions.append)
+
+    def runner(job):
+        # a real HTTP request on the app's shared session, like a download
+        resp = get_session().get(job.url, timeout=3)
+        resp.raise_for_status()
+        job.bytes_transferred = len(resp.content)
+
+    queue = DownloadQueue(runner, workers=2, connectivity=monitor)
+    failures = []
+
+    def check(ok, message):
+        print(f"{'ok  ' if ok else 'FAIL'} {message}")
+        if not ok:
+            failures.append(message)
+
+    try:
+        first = queue.submit(f"{server.base_url}/media", "720p")
+        check(wait_for(lambda: not monitor.online, 5), "a failed download takes the monitor offline")
+        check(wait_for(lambda: first.status == first.QUEUED and first.retries == 1, 5),
+              "the job is re-queued instead of failing")
+
+        second = queue.submit(f"{server.base_url}/media", "720p")
+        check(wait_for(lambda: len(server.probes) >= 3, 5), "the monitor probes the stand-in while offline")
+        gaps = [b - a for a, b in zip(server.probes, server.probes[1:])]
+        check(len(gaps) >= 2 and gaps[-1] > gaps[0] * 1.5, f"probes back off ({', '.join(f'{g:.2f}s' for g in gaps)})")
+        check(second.status == second.QUEUED, "jobs submitted while offline wait in the queue")
+
+        server.up = True
+        check(wait_for(lambda: monitor.online, 5), "a successful probe brings the monitor online")
+        check(wait_for(lambda: first.status == first.DONE and second.status == second.DONE, 10),
+              "queued jobs resume and finish")
+        check(transitions == [False, True], f"listeners saw offline then online ({transitions})")
+        probes = len(server.probes)
+        time.sleep(0.5)
+        check(len(server.probes) == probes, "nothing is probed while online")
+    finally:
+        server.stop()
+
+    print("connectivity check " + ("failed" if failures else "passed"))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+Download benchmark, fully offline.
+
+Starts benchmarks/fake_media.py on localhost, loads and downloads its
+synthetic videos through the real app code, and reports throughput, time
+to first byte, UI events, peak RSS and startup time. Run from the repo root:
+
+    python benchmarks/downloads.py [--scenario progressive dash] [--videos 6] [--size-mb 8]
+                                   [--rate 4M] [--latency-ms 20] [--json]
+
+The VideoController drives the downloads exactly as the window does
+(LOAD, pick the top resolution, DOWNLOAD) with message boxes suppressed.
+With a display it runs on a real, hidden Tk window; without one (auto on
+a headless CI box, or --driver headless) it runs on stand-ins for the Tk
+root and the view, so UI events are still counted. --driver engine drives
+the DownloadEngine directly instead. Each scenario runs in its own process
+so peak RSS is per scenario. Exits non-zero when a --min-*/--max-* budget
+is exceeded.
+"""
+import argparse
+import contextlib
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+# the repo for the app modules; this directory for fake_media and the stub extractor plugin
+for _path in (REPO_DIR, BENCH_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from downloader_bandwidth import parse_rate  # noqa: E402
+from fake_media import FakeMediaServer  # noqa: E402
+
+
+def bench_model(app_dir, base_url):
+    """A VideoModel whose files all live in app_dir and that never touches the real network."""
+    from downloader_model import VideoModel
+
+    class BenchModel(VideoModel):
+        DOWNLOAD_DIR = os.path.join(app_dir, "downloads")
+        APP_DIR = app_dir
+        METADATA_CACHE_DIR = os.path.join(app_dir, "metadata")
+        THUMB_CACHE_DIR = os.path.join(app_dir, "thumbnails")
+        SPLASH_CACHE_DIR = os.path.join(app_dir, "splash")
+        JOB_STATE_FILE = os.path.join(app_dir, "jobs.json")
+        METRICS_LOG = os.path.join(app_dir, "metrics.jsonl")
+        HISTORY_DB = os.path.join(app_dir, "history.db")
+        CONNECTIVITY_PROBE_URL = f"{base_url}/generate_204"
+        USE_DAEMON = False  # measure the in-process engine, not a shared daemon
+
+    return BenchModel()
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# -----------------------
+# Headless stand-ins for the window
+# -----------------------
+class StubRoot:
+    """The parts of a Tk root the controller uses: an after() queue that update() runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()   # after() is called from worker threads too, via _ui
+        self._timers = []               # heap of (due, id, fn, args)
+        self._ids = itertools.count()
+        self._cancelled = set()
+
+    def after(self, ms, fn, *args):
+        timer_id = next(self._ids)
+        with self._lock:
+            heapq.heappush(self._timers, (time.monotonic() + ms / 1000, timer_id, fn, args))
+        return timer_id
+
+    def after_idle(self, fn, *args):
+        return self.after(0, fn, *args)
+
+    def after_cancel(self, timer_id):
+        with self._lock:
+            self._cancelled.add(timer_id)
+
+    def update(self):
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._timers or self._timers[0][0] > now:
+                    return
+                _, timer_id, fn, args = heapq.heappop(self._timers)
+                if timer_id in self._cancelled:
+                    self._cancelled.discard(timer_id)
+                    continue
+            try:
+                fn(*args)
+            except Exception:
+                traceback.print_exc()  # reported and dropped, as Tk does with callback errors
+
+    def destroy(self):
+        with self._lock:
+            self._timers.clear()
+
+
+class StubWidget:
+    """Any widget or variable the controller touches: keeps configure() options and one value."""
+
+    def __init__(self, value=""):
+        self.options = {}
+        self.value = value
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    def cget(self, name):
+        return self.options.get(name)
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+    def insert(self, _index, text):
+        self.value += text
+
+    def delete(self, _first, _last=None):
+        self.value = ""
+
+    def bind(self, *args, **kwargs):
+        pass
+
+
+class StubView:
+    """VideoView's widgets as StubWidgets; message boxes and choices are dropped."""
+
+    WIDGETS = ("entry", "clip_start", "clip_end", "res_menu", "progress_bar", "placeholder", "video_title",
+               "details_label", "load_btn", "download_btn", "history_btn", "queue_btn")
+
+    def __init__(self, root):
+        self.root = root
+        for name in self.WIDGETS:
+            setattr(self, name, StubWidget())
+        self.res_var = StubWidget("Resolution")
+        self.precise_cuts_var = StubWidget(False)
+
+    def show_message(self, title, message):
+        pass
+
+    def ask_choice(self, title, message, choices, on_choice):
+        pass
+
+
+# -----------------------
+# Drivers
+# -----------------------
+def drive_engine(model, urls, jobs):
+    from downloader_engine import DownloadEngine
+    from downloader_formats import FormatIndex
+
+    engine = DownloadEngine(model, workers=jobs)
+    for url in urls:
+        info = engine.load(url)
+        option = FormatIndex(info).select()
+        engine.submit(url, option.label, info=info, option=option)
+    while engine.has_active_jobs():
+        time.sleep(0.01)
+    return engine.queue.snapshot(), None
+
+
+def drive_controller(model, urls, jobs, headless=False):
+    """LOAD and DOWNLOAD each URL through the real controller, pumping the Tk loop ourselves."""
+    from downloader_controller import VideoController
+
+    model.MAX_CONCURRENT_DOWNLOADS = jobs
+    if headless:
+        root = StubRoot()
+        view = StubView(root)
+    else:
+        import customtkinter as ctk
+        from downloader_view import VideoView
+
+        root = ctk.CTk()
+        root.withdraw()
+        view = VideoView(root)
+        view.show_message = lambda title, message: None  # modal dialogs would block the run
+    controller = VideoController(model, view)
+    if headless:
+        # ImageTk needs a real Tk interpreter; show the decoded thumbnail as it is
+        controller._show_thumbnail = lambda key, img: controller._apply_thumbnail(img)
+        controller._cache_thumbnail = lambda key, img: None
+
+    def pump_until(done, timeout=120):
+        deadline = time.time() + timeout
+        while not done():
+            if time.time() > deadline:
+                raise TimeoutError("benchmark run timed out")
+            root.update()
+            time.sleep(0.005)
+
+    try:
+        for count, url in enumerate(urls, start=1):
+            view.entry.delete(0, "end")
+            view.entry.insert(0, url)
+            controller.load_video()
+            pump_until(lambda: controller._loaded_url == url and view.res_var.get() in controller._format_options)
+            controller.download_video()
+            # DOWNLOAD queues the job from a background thread
+            pump_until(lambda: len(controller.queue.snapshot()) == count)
+        pump_until(lambda: not controller._has_active_jobs())
+        root.update()
+        return controller.queue.snapshot(), controller.progress_stats()
+    finally:
+        root.destroy()
+
+
+def pick_driver(name):
+    if name != "auto":
+        return name
+    try:
+        import tkinter
+        tkinter.Tk().destroy()
+        return "controller"
+    except Exception:
+        return "headless"  # no display: the same controller on stand-in widgets
+
+
+# -----------------------
+# One scenario (runs in a child process)
+# -----------------------
+def run_scenario(args, scenario):
+    server = FakeMediaServer(scenario, videos=args.videos, size=int(args.size_mb * 1024 * 1024),
+                             rate=args.rate, latency=args.latency_ms / 1000)
+    base_url = server.start()
+    app_dir = tempfile.mkdtemp(prefix="winbix-bench-")
+    driver = pick_driver(args.driver)
+    try:
+        # app and yt-dlp console output must not mix with the report
+        with contextlib.redirect_stdout(sys.stderr):
+            model = bench_model(app_dir, base_url)
+            started = time.perf_counter()
+            if driver == "engine":
+                jobs, ui_stats = drive_engine(model, server.watch_urls(), args.jobs)
+            else:
+                jobs, ui_stats = drive_controller(model, server.watch_urls(), args.jobs,
+                                                  headless=driver == "headless")
+            elapsed = time.perf_counter() - started
+    finally:
+        server.stop()
+        shutil.rmtree(app_dir, ignore_errors=True)
+
+    done = [j for j in jobs if j.status == j.DONE]
+    total_bytes = sum(j.bytes_transferred for j in done)
+    ttfbs = sorted(j.timings["ttfb"] * 1000 for j in done if "ttfb" in j.timings)
+    result = {
+        "scenario": scenario,
+        "driver": driver,
+        "jobs": len(jobs),
+        "failed": len(jobs) - len(done),
+        "bytes": total_bytes,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_mib_s": round(total_bytes / elapsed / (1024 * 1024), 2) if elapsed else 0,
+        "ttfb_ms_median": round(statistics.median(ttfbs), 1) if ttfbs else None,
+        "ttfb_ms_max": round(ttfbs[-1], 1) if ttfbs else None,
+        "hook_calls": sum(j.hook_calls for j in jobs),
+        "ui_events": None,
+        "ui_events_per_s": None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if ui_stats is not None:
+        result["ui_events"] = ui_stats["ui_events"]
+        result["ui_events_per_s"] = round(ui_stats["ui_events"] / elapsed, 1)
+    if result["peak_rss_mb"] is not None:
+        result["peak_rss_mb"] = round(result["peak_rss_mb"], 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=("progressive", "dash"), default=["progressive", "dash"])
+    parser.add_argument("--videos", type=int, default=6)
+    parser.add_argument("--size-mb", type=float, default=8, help="size of each video at its top resolution")
+    parser.add_argument("-j", "--jobs", type=int, default=3, help="concurrent downloads")
+    parser.add_argument("--rate", type=parse_rate, default=None, help="per-connection server rate, e.g. 4M")
+    parser.add_argument("--latency-ms", type=float, default=0, help="server delay before each response")
+    parser.add_argument("--driver", choices=("auto", "controller", "headless", "engine"), default="auto")
+    parser.add_argument("--skip-startup", action="store_true", help="don't measure import time")
+    parser.add_argument("--min-throughput-mib-s", type=float, default=None)
+    parser.add_argument("--max-ttfb-ms", type=float, default=None)
+    parser.add_argument("--max-rss-mb", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="print one JSON object instead of text")
+    args = parser.parse_args()
+
+    results = []
+    for scenario in args.scenario:
+        # a fresh process per scenario, so peak RSS and warm caches don't leak between them
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results.append(pool.submit(run_scenario, args, scenario).result())
+
+    startup_ms = None
+    if not args.skip_startup:
+        from startup import import_time_ms
+        startup_ms = import_time_ms()[0]
+
+    if args.json:
+        print(json.dumps({"startup_import_ms": startup_ms, "scenarios": results}))
+    else:
+        if startup_ms is not None:
+            print(f"startup: import downloader_controller {startup_ms:.1f} ms")
+        for r in results:
+            ui = (f"{r['ui_events']} UI events ({r['ui_events_per_s']}/s) for {r['hook_calls']} hook calls"
+                  if r["ui_events"] is not None else f"UI not driven, {r['hook_calls']} hook calls")
+            print(f"{r['scenario']} [{r['driver']}]: {r['jobs'] - r['failed']}/{r['jobs']} jobs, "
+                  f"{r['bytes'] / (1024 * 1024):.1f} MiB in {r['elapsed_s']:.2f} s = {r['throughput_mib_s']} MiB/s")
+            print(f"    ttfb median {r['ttfb_ms_median']} ms, max {r['ttfb_ms_max']} ms | {ui} | "
+                  f"peak RSS {r['peak_rss_mb']} MB")
+
+    failed = False
+    for r in results:
+        checks = [
+            (r["failed"], "jobs failed"),
+            (args.min_throughput_mib_s is not None and r["throughput_mib_s"] < args.min_throughput_mib_s,
+             f"throughput below {args.min_throughput_mib_s} MiB/s"),
+            (args.max_ttfb_ms is not None and (r["ttfb_ms_median"] or 0) > args.max_ttfb_ms,
+             f"median ttfb above {args.max_ttfb_ms} ms"),
+            (args.max_rss_mb is not None and (r["peak_rss_mb"] or 0) > args.max_rss_mb,
+             f"peak RSS above {args.max_rss_mb} MB"),
+        ]
+        for bad, message in checks:
+            if bad:
+                print(f"FAIL: {r['scenario']}: {message}", file=sys.stderr)
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
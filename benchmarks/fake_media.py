@@ -0,0 +1,235 @@
+"""
+Local stand-in for a video site, for the offline benchmarks.
+
+FakeMediaServer serves a small catalog of synthetic videos on 127.0.0.1:
+
+    /watch/<id>            the page URL handed to the app
+    /info/<id>.json        the info dict the stub extractor returns for it
+    /media/<id>/<file>     the media bytes, with Range support
+    /thumb/<id>.jpg        a generated thumbnail
+    /generate_204          connectivity probe
+
+Media is deterministic filler, so runs are reproducible. "progressive"
+videos have one muxed file per height; "dash" videos are split into
+segments fetched through yt-dlp's DASH fragment downloader. `rate`
+throttles each response (bytes/sec) and `latency` delays its headers,
+to model a slow link and time to first byte.
+
+The stub extractor lives in yt_dlp_plugins/extractor/ next to this file
+and is picked up by yt-dlp's plugin loader when this directory is on
+sys.path.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_BLOCK = random.Random(0).randbytes(64 * 1024)
+_CHUNK = 16 * 1024
+_MEDIA_RE = re.compile(r"^/media/(?P<id>[\w-]+)/(?P<file>[\w.-]+)$")
+
+
+def filler(offset, length):
+    """length bytes of the endless filler stream, starting at offset."""
+    out = bytearray()
+    while len(out) < length:
+        start = (offset + len(out)) % len(_BLOCK)
+        out += _BLOCK[start:start + length - len(out)]
+    return bytes(out)
+
+
+class FakeMediaServer:
+    def __init__(self, kind="progressive", videos=4, size=8 * 1024 * 1024, heights=(360, 720),
+                 segment_size=512 * 1024, rate=None, latency=0.0):
+        assert kind in ("progressive", "dash"), kind
+        self.kind = kind
+        self.video_ids = [f"{kind}{i:03d}" for i in range(videos)]
+        self.size = size
+        self.heights = sorted(heights)
+        self.segment_size = segment_size
+        self.rate = rate
+        self.latency = latency
+        self.requests = 0
+        self._thumb = None
+        self._httpd = None
+
+    # -----------------------
+    # Lifecycle
+    # -----------------------
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_HEAD(self):
+                server._handle(self, body=False)
+
+            def do_GET(self):
+                server._handle(self, body=True)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="fake-media-server", daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def watch_urls(self):
+        return [f"{self.base_url}/watch/{video_id}" for video_id in self.video_ids]
+
+    # -----------------------
+    # Catalog
+    # -----------------------
+    def file_size(self, height):
+        # higher resolutions are proportionally bigger; the top one is `size`
+        return self.size * height // self.heights[-1]
+
+    def info(self, video_id):
+        base = self.base_url
+        formats = []
+        for height in self.heights:
+            nbytes = self.file_size(height)
+            fmt = {
+                "format_id": f"{height}p" if self.kind == "progressive" else f"dash-{height}p",
+                "ext": "mp4",
+                "vcodec": "avc1.4d401f",
+                "acodec": "mp4a.40.2",
+                "height": height,
+                "width": height * 16 // 9,
+                "filesize": nbytes,
+                "tbr": nbytes * 8 / 1000 / 60,
+            }
+            if self.kind == "progressive":
+                fmt["url"] = f"{base}/media/{video_id}/{height}.mp4"
+            else:
+                count = -(-nbytes // self.segment_size)
+                fmt.update({
+                    "protocol": "http_dash_segments",
+                    "url": f"{base}/media/{video_id}/{height}.mpd",
+                    "fragment_base_url": f"{base}/media/{video_id}/",
+                    "fragments": [{"path": f"{height}-{i}.m4s", "duration": 60 / count} for i in range(count)],
+                })
+            formats.append(fmt)
+        return {
+            "id": video_id,
+            "title": f"Benchmark video {video_id}",
+            "duration": 60,
+            "thumbnail": f"{base}/thumb/{video_id}.jpg",
+            "webpage_url": f"{base}/watch/{video_id}",
+            "formats": formats,
+            "epoch": int(time.time()),
+        }
+
+    def _media(self, name):
+        """(offset, length) of a media file within the filler stream, or None."""
+        match = re.match(r"^(\d+)(?:-(\d+))?\.(mp4|m4s)$", name)
+        if not match or int(match.group(1)) not in self.heights:
+            return None
+        nbytes = self.file_size(int(match.group(1)))
+        if match.group(2) is None:
+            return 0, nbytes
+        start = int(match.group(2)) * self.segment_size
+        if start >= nbytes:
+            return None
+        return start, min(self.segment_size, nbytes - start)
+
+    def _thumbnail(self):
+        if self._thumb is None:
+            from io import BytesIO
+            from PIL import Image
+
+            buf = BytesIO()
+            Image.new("RGB", (640, 360), (40, 90, 120)).save(buf, "JPEG")
+            self._thumb = buf.getvalue()
+        return self._thumb
+
+    # -----------------------
+    # Requests
+    # -----------------------
+    def _handle(self, handler, body):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        path = handler.path.split("?")[0]
+
+        if path == "/generate_204":
+            return self._send(handler, 204, b"", body=body)
+
+        if path.startswith("/watch/"):
+            return self._send(handler, 200, b"<html></html>", "text/html", body=body)
+
+        match = re.match(r"^/info/([\w-]+)\.json$", path)
+        if match and match.group(1) in self.video_ids:
+            data = json.dumps(self.info(match.group(1))).encode("utf-8")
+            return self._send(handler, 200, data, "application/json", body=body)
+
+        match = re.match(r"^/thumb/([\w-]+)\.jpg$", path)
+        if match and match.group(1) in self.video_ids:
+            return self._send(handler, 200, self._thumbnail(), "image/jpeg", body=body)
+
+        match = _MEDIA_RE.match(path)
+        media = self._media(match.group("file")) if match and match.group("id") in self.video_ids else None
+        if media is None:
+            return self._send(handler, 404, b"not found", body=body)
+        self._send_media(handler, *media, body=body)
+
+    def _send(self, handler, status, data, content_type="application/octet-stream", body=True):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        if body:
+            handler.wfile.write(data)
+
+    def _send_media(self, handler, offset, length, body=True):
+        start, end = 0, length - 1
+        match = re.match(r"bytes=(\d*)-(\d*)", handler.headers.get("Range") or "")
+        if match:
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), end) if match.group(2) else end
+            elif match.group(2):
+                start = max(length - int(match.group(2)), 0)
+            if start > end:
+                handler.send_response(416)
+                handler.send_header("Content-Range", f"bytes */{length}")
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+                return
+
+        handler.send_response(206 if match else 200)
+        handler.send_header("Content-Type", "video/mp4")
+        handler.send_header("Accept-Ranges", "bytes")
+        handler.send_header("Content-Length", str(end - start + 1))
+        if match:
+            handler.send_header("Content-Range", f"bytes {start}-{end}/{length}")
+        handler.end_headers()
+        if not body:
+            return
+
+        sent, began = 0, time.monotonic()
+        while start + sent <= end:
+            chunk = filler(offset + start + sent, min(_CHUNK, end - start - sent + 1))
+            try:
+                handler.wfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            sent += len(chunk)
+            if self.rate:
+                ahead = sent / self.rate - (time.monotonic() - began)
+                if ahead > 0:
+                    time.sleep(ahead)
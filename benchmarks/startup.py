@@ -0,0 +1,154 @@
+"""
+Startup benchmark.
+
+Reports the import cost of the app modules (python -X importtime), the
+time until the first window frame has been drawn, and until the window has
+attached to the download daemon in the background, starting it if needed,
+as on a normal launch. A daemon started only for the benchmark is shut down
+afterwards. Run from the repo root:
+
+    python benchmarks/startup.py [--runs 5] [--max-import-ms 100] [--max-frame-ms 1500]
+
+Exits non-zero when a budget is exceeded, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_FRAME_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import customtkinter as ctk
+from downloader_model import VideoModel
+from downloader_view import VideoView
+from downloader_controller import VideoController
+from splash import show_splash
+
+root = ctk.CTk()
+model = VideoModel()
+controller = VideoController(model, VideoView(root))
+show_splash(root, "images/splash.gif", duration=3000, cache_dir=model.SPLASH_CACHE_DIR)
+root.update()
+first_frame_ms = (time.perf_counter() - t0) * 1000
+# the engine attaches in the background once the window is up
+while not controller._engine_ready.is_set() and time.perf_counter() - t0 < 30:
+    root.update()
+    time.sleep(0.01)
+attached_ms = (time.perf_counter() - t0) * 1000 if controller._engine_ready.is_set() else None
+print(json.dumps({"first_frame_ms": first_frame_ms, "engine_attached_ms": attached_ms}))
+root.destroy()
+"""
+
+
+def import_time_ms(module="downloader_controller"):
+    """Cumulative import time of module in a fresh interpreter, in ms."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    top = {}
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        if name == "site":
+            top.clear()  # everything so far was interpreter startup
+            continue
+        top[name] = int(parts[1]) / 1000
+    total = top.pop(module)
+    return total, sorted(top.items(), key=lambda kv: kv[1], reverse=True)[:5]
+
+
+def first_frame_ms():
+    """
+    Times from the first app import until the window has drawn and until its
+    engine is attached, plus the wall time; (None, None, wall) without a display.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", FIRST_FRAME_SCRIPT],
+                          cwd=REPO_DIR, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    for line in proc.stdout.splitlines():
+        if line.startswith("{"):
+            result = json.loads(line)
+            return result["first_frame_ms"], result["engine_attached_ms"], wall_ms
+    return None, None, wall_ms
+
+
+def running_daemon():
+    """DaemonClient for the download daemon the app would attach to, or None."""
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    from downloader_client import DaemonClient
+    from downloader_model import VideoModel
+
+    return DaemonClient.from_state_file(VideoModel.DAEMON_STATE_FILE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-frame-ms", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="print one JSON object instead of text")
+    args = parser.parse_args()
+
+    imports, frames, attaches, walls = [], [], [], []
+    heaviest = []
+    daemon_was_running = running_daemon() is not None
+    try:
+        for _ in range(args.runs):
+            ms, heaviest = import_time_ms()
+            imports.append(ms)
+            frame, attached, wall = first_frame_ms()
+            if frame is not None:
+                frames.append(frame)
+                walls.append(wall)
+            if attached is not None:
+                attaches.append(attached)
+    finally:
+        daemon = None if daemon_was_running else running_daemon()
+        if daemon is not None:
+            daemon.request("POST", "/shutdown")  # started by the first run, not by the user
+
+    result = {
+        "import_ms": statistics.median(imports),
+        "first_frame_ms": statistics.median(frames) if frames else None,
+        "process_to_first_frame_ms": statistics.median(walls) if walls else None,
+        # the first run may have started the daemon; the median is a warm attach
+        "engine_attached_ms": statistics.median(attaches) if attaches else None,
+        "heaviest_imports": heaviest,
+    }
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"import downloader_controller: {result['import_ms']:.1f} ms (median of {args.runs})")
+        for name, ms in heaviest:
+            print(f"    {ms:8.1f} ms  {name}")
+        if frames:
+            print(f"first frame: {result['first_frame_ms']:.1f} ms in-process, "
+                  f"{result['process_to_first_frame_ms']:.1f} ms including interpreter start")
+        else:
+            print("first frame: skipped (no display)")
+        if attaches:
+            print(f"engine attached (in the background): {result['engine_attached_ms']:.1f} ms")
+
+    failed = False
+    if args.max_import_ms is not None and result["import_ms"] > args.max_import_ms:
+        print(f"FAIL: import time above {args.max_import_ms} ms", file=sys.stderr)
+        failed = True
+    if args.max_frame_ms is not None and frames and result["first_frame_ms"] > args.max_frame_ms:
+        print(f"FAIL: first frame above {args.max_frame_ms} ms", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# Stub extractor for benchmarks/fake_media.py. yt-dlp loads it as a plugin
+# whenever the benchmarks directory is on sys.path.
+from yt_dlp.extractor.common import InfoExtractor
+
+
+class FakeMediaIE(InfoExtractor):
+    IE_NAME = "fakemedia"
+    _VALID_URL = r"https?://127\.0\.0\.1:\d+/watch/(?P<id>[\w-]+)"
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        base = url.split("/watch/")[0]
+        return self._download_json(f"{base}/info/{video_id}.json", video_id)
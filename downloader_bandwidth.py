@@ -0,0 +1,139 @@
+import collections
+import re
+import threading
+import time
+
+_RATE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmg]?)i?b?(?:/s)?\s*$", re.IGNORECASE)
+_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_rate(text):
+    """'500K', '2M', '1.5MB/s' -> bytes/sec; 'unlimited', 'none' or '0' -> None."""
+    if text is None or str(text).strip().lower() in ("", "unlimited", "none", "0"):
+        return None
+    match = _RATE_RE.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid rate: {text!r}")
+    return int(float(match.group(1)) * _UNITS[match.group(2).lower()])
+
+
+def parse_schedule(text):
+    """'8=1M,18=unlimited' -> [(8, 1048576), (18, None)]"""
+    schedule = []
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        hour, _, rate = part.partition("=")
+        schedule.append((int(hour), parse_rate(rate)))
+    return sorted(schedule)
+
+
+class BandwidthScheduler:
+    """
+    One token bucket shared by every active download. Progress hooks call
+    `consume` with the bytes they just received and block until the global
+    budget allows them, which in turn stalls that download's read loop.
+
+    Waiters with a higher priority are always served before lower ones.
+    The budget is `rate` bytes/sec, or the entry of `schedule` (a list of
+    (start_hour, rate)) covering the current hour; None means unlimited.
+    Both can be changed at runtime; a rate set at runtime takes precedence
+    over the schedule until `follow_schedule` is called.
+    """
+
+    def __init__(self, rate=None, schedule=None, burst_seconds=1.0, meter_window=2.0):
+        self.rate = rate
+        self.schedule = sorted(schedule or [])
+        self._override = False   # set_rate was called since the schedule last applied
+        self.burst_seconds = burst_seconds
+        self.meter_window = meter_window
+        self._tokens = 0.0
+        self._last_refill = time.monotonic()
+        self._waiting = collections.Counter()
+        self._cond = threading.Condition()
+        self._samples = collections.deque()  # (timestamp, nbytes) for the live rate
+
+    # -----------------------
+    # Configuration
+    # -----------------------
+    def set_rate(self, rate):
+        with self._cond:
+            self.rate = rate
+            self._override = True
+            self._cond.notify_all()
+
+    def set_schedule(self, schedule):
+        with self._cond:
+            self.schedule = sorted(schedule or [])
+            self._override = False
+            self._cond.notify_all()
+
+    def follow_schedule(self):
+        """Drop a rate set at runtime and go back to the schedule."""
+        with self._cond:
+            self._override = False
+            self._cond.notify_all()
+
+    @property
+    def following_schedule(self):
+        return bool(self.schedule) and not self._override
+
+    def current_rate(self):
+        if not self.following_schedule:
+            return self.rate
+        hour = time.localtime().tm_hour
+        # the last entry starting at or before now; before the first one, yesterday's last entry applies
+        active = self.schedule[-1][1]
+        for start_hour, rate in self.schedule:
+            if start_hour <= hour:
+                active = rate
+        return active
+
+    # -----------------------
+    # Token bucket
+    # -----------------------
+    def consume(self, nbytes, priority=0, cancel_event=None):
+        """Block until nbytes may be transferred. Returns early if cancel_event is set."""
+        if nbytes <= 0:
+            return
+        with self._cond:
+            self._record(nbytes)
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    rate = self.current_rate()
+                    if rate is None:
+                        return
+                    self._refill(rate)
+                    outranked = any(n for p, n in self._waiting.items() if p > priority)
+                    if self._tokens > 0 and not outranked:
+                        # may go negative: the debt delays whoever comes next
+                        self._tokens -= nbytes
+                        return
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    deficit = -self._tokens if self._tokens <= 0 else 0
+                    self._cond.wait(min(max(deficit / rate, 0.01), 0.25))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+    def _refill(self, rate):
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._last_refill) * rate, rate * self.burst_seconds)
+        self._last_refill = now
+
+    # -----------------------
+    # Live aggregate rate
+    # -----------------------
+    def _record(self, nbytes):
+        # called with the lock held
+        now = time.monotonic()
+        self._samples.append((now, nbytes))
+        while self._samples and now - self._samples[0][0] > self.meter_window:
+            self._samples.popleft()
+
+    def aggregate_rate(self):
+        """Bytes/sec across all downloads over the last meter_window seconds."""
+        now = time.monotonic()
+        with self._cond:
+            total = sum(n for t, n in self._samples if now - t <= self.meter_window)
+        return total / self.meter_window
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+from downloader_net import get_session
+
+_YOUTUBE_ID_RE = re.compile(r"(?:v=|youtu\.be/|/shorts/|/embed/|/live/)([0-9A-Za-z_-]{11})")
+
+
+def cache_key(text):
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()
+
+
+def video_key(url):
+    """Cache key for a URL: the YouTube video id when there is one, else a hash of the URL."""
+    match = _YOUTUBE_ID_RE.search(url)
+    if match:
+        return match.group(1)
+    return cache_key(url)
+
+
+class MetadataCache:
+    """
+    On-disk cache of sanitized yt-dlp info dicts, one JSON file per video.
+    Entries expire after `ttl` seconds; once more than `max_entries` are
+    stored the least recently used ones (by file mtime) are evicted.
+    """
+
+    # Bulky fields the app never uses
+    DROP_KEYS = ("automatic_captions", "subtitles", "heatmap", "thumbnails", "description")
+
+    def __init__(self, cache_dir, ttl=7 * 24 * 3600, max_entries=500):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, f"{video_key(url)}.json")
+
+    def get(self, url):
+        path = self._path(url)
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+
+            if time.time() - entry.get("fetched_at", 0) > self.ttl:
+                self._remove(path)
+                self.misses += 1
+                return None
+            self.hits += 1
+
+            # touch so LRU eviction sees this entry as recently used
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            return entry["info"]
+
+    def put(self, url, info):
+        info = {k: v for k, v in info.items() if k not in self.DROP_KEYS}
+        entry = {"fetched_at": time.time(), "info": info}
+        path = self._path(url)
+        tmp_path = f"{path}.tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Metadata cache write error: {e}")
+                return
+            self._evict()
+
+    def invalidate(self, url):
+        with self._lock:
+            self._remove(self._path(url))
+
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def _evict(self):
+        _evict_lru_files(self.cache_dir, ".json", self.max_entries)
+
+    @staticmethod
+    def _remove(path):
+        _remove_file(path)
+
+
+class ThumbnailCache:
+    """
+    Two-tier thumbnail cache.
+
+    The disk tier holds already-resized PNGs, so a hit skips both the
+    download and the resize. The memory tier holds the Tk images shown in
+    the view, LRU-evicted once their decoded size passes `max_bytes`.
+    `fetch` may run on any thread; Tk images must be created on the main
+    loop and handed back with `put`. A lookup counts as a hit when either
+    tier serves it and as a miss when it has to be downloaded.
+    """
+
+    def __init__(self, cache_dir, size=(300, 200), max_bytes=16 * 1024 * 1024, max_files=2000):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # -----------------------
+    # Memory tier
+    # -----------------------
+    def get(self, key):
+        with self._lock:
+            item = self._images.get(key)
+            if item is None:
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, tk_img):
+        nbytes = tk_img.width() * tk_img.height() * 4
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._images[key] = (tk_img, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, (_, evicted) = self._images.popitem(last=False)
+                self._bytes -= evicted
+
+    # -----------------------
+    # Disk tier / network
+    # -----------------------
+    def fetch(self, url, key):
+        """Return a resized PIL image for url, from disk or the network. Blocking."""
+        from PIL import Image
+
+        path = os.path.join(self.cache_dir, f"{key}.png")
+        try:
+            img = Image.open(path)
+            img.load()
+            os.utime(path, None)
+            with self._lock:
+                self.hits += 1
+            return img
+        except OSError:
+            pass
+
+        with self._lock:
+            self.misses += 1
+        resp = get_session().get(url, timeout=8)
+        resp.raise_for_status()
+        img = Image.open(BytesIO(resp.content))
+        # let the JPEG decoder scale down while decoding instead of after
+        img.draft("RGB", self.size)
+        img = img.convert("RGBA")
+        img.thumbnail(self.size, Image.LANCZOS)
+
+        try:
+            img.save(path, "PNG")
+            _evict_lru_files(self.cache_dir, ".png", self.max_files)
+        except OSError as e:
+            print(f"Thumbnail cache write error: {e}")
+        return img
+
+
+def _evict_lru_files(directory, suffix, max_entries):
+    """Delete the least recently touched files once a cache directory holds more than max_entries."""
+    try:
+        entries = [os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(suffix)]
+    except OSError:
+        return
+    if len(entries) <= max_entries:
+        return
+    entries.sort(key=lambda p: os.path.getmtime(p))
+    for path in entries[:len(entries) - max_entries]:
+        _remove_file(path)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
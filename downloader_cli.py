@@ -0,0 +1,160 @@
+"""
+Headless batch downloader: runs the same DownloadEngine as the window, without Tk.
+
+    python -m downloader_cli urls.txt -j 4 -r 720p
+    cat urls.txt | python -m downloader_cli -
+
+URLs are read one per line (blank lines and # comments are skipped);
+playlist and channel URLs are expanded into their videos. Progress is
+printed to stdout as JSON lines: "status" events on every job state
+change, "progress" snapshots of running jobs every --interval seconds and
+a final "summary". The exit code is 1 if any job failed.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from downloader_bandwidth import parse_rate, parse_schedule
+from downloader_engine import DownloadEngine, is_batch_url, parse_clip
+from downloader_model import VideoModel
+from downloader_queue import JobStore
+
+
+def read_urls(source):
+    f = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class JsonReporter:
+    def __init__(self, out):
+        self.out = out
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        fields = {"event": event, "time": round(time.time(), 3), **fields}
+        with self._lock:
+            self.out.write(json.dumps(fields) + "\n")
+            self.out.flush()
+
+    def job_changed(self, job):
+        self.emit("status", job=job.id, url=job.url, title=job.title, status=job.status,
+                  file=job.file_path, error=job.error, already_downloaded=job.stage == "already downloaded")
+
+    def progress(self, jobs):
+        for job in jobs:
+            if job.status == job.RUNNING:
+                self.emit("progress", job=job.id, stage=job.stage, downloaded_bytes=job.downloaded_bytes,
+                          total_bytes=job.total_bytes, speed=job.speed, eta=job.eta, priority=job.priority)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m downloader_cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", default="-", help="file with one URL per line, or - for stdin")
+    parser.add_argument("-j", "--jobs", type=int, default=VideoModel.MAX_CONCURRENT_DOWNLOADS,
+                        help="concurrent downloads")
+    parser.add_argument("-r", "--resolution", default=VideoModel.BATCH_DEFAULT_RESOLUTION,
+                        help='e.g. 720p, "original" for the best available, or "audio" for the audio stream only')
+    parser.add_argument("-o", "--output", default=None, help="download folder (default: ~/Downloads)")
+    parser.add_argument("--fragments", type=int, default=VideoModel.FRAGMENT_CONCURRENCY,
+                        help="DASH/HLS fragments fetched in parallel per job")
+    parser.add_argument("--postprocessors", type=int, default=VideoModel.POSTPROCESS_WORKERS,
+                        help="concurrent merges/remuxes, separate from the download slots")
+    parser.add_argument("--state", default=None,
+                        help="JSON file for job state; unfinished jobs in it are resumed first")
+    parser.add_argument("--limit", type=parse_rate, default=None, help="global bandwidth budget, e.g. 500K or 2M")
+    parser.add_argument("--schedule", type=parse_schedule, default=None,
+                        help='time-of-day budget as hour=rate pairs, e.g. "8=1M,18=unlimited"')
+    parser.add_argument("--metrics-log", default=VideoModel.METRICS_LOG,
+                        help="JSON-lines file of per-job phase timings")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus-style metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--on-duplicate", choices=("skip", "relink", "redownload"),
+                        default=VideoModel.DUPLICATE_POLICY,
+                        help="videos already in the download index: skip them, link the existing file "
+                             "into the output folder, or download again")
+    parser.add_argument("--start", default=None,
+                        help="download only from this time (seconds, m:ss or h:mm:ss); single videos only, "
+                             "playlists are still downloaded whole")
+    parser.add_argument("--end", default=None, help="download only up to this time, see --start")
+    parser.add_argument("--precise-cuts", action="store_true",
+                        help="re-encode around --start/--end for exact cuts instead of the nearest keyframes")
+    parser.add_argument("--rescan", action="store_true",
+                        help="rebuild the download index from the output folder before starting")
+    parser.add_argument("--daemon", action="store_true",
+                        help="queue the downloads on the shared download daemon (started if needed) instead of "
+                             "in this process; the daemon keeps its own folder, limits and state settings")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between progress snapshots")
+    args = parser.parse_args(argv)
+    try:
+        clip = parse_clip(args.start, args.end)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # stdout carries only JSON; anything else printed goes to stderr
+    reporter = JsonReporter(sys.stdout)
+    sys.stdout = sys.stderr
+
+    model = VideoModel()
+    if args.output:
+        model.DOWNLOAD_DIR = args.output
+    model.FRAGMENT_CONCURRENCY = args.fragments
+    model.POSTPROCESS_WORKERS = args.postprocessors
+    model.BANDWIDTH_LIMIT = args.limit
+    if args.schedule:
+        model.BANDWIDTH_SCHEDULE = args.schedule
+    model.METRICS_LOG = args.metrics_log
+    model.METRICS_PORT = args.metrics_port
+    model.DUPLICATE_POLICY = args.on_duplicate
+
+    if args.daemon:
+        from downloader_client import connect
+        engine = connect(model)
+        if engine is None:
+            reporter.emit("error", error=f"download daemon did not start, see {model.DAEMON_LOG}")
+            return 1
+    else:
+        engine = DownloadEngine(model, workers=args.jobs, job_store=JobStore(args.state) if args.state else None)
+    engine.add_listener(reporter.job_changed)
+    if args.rescan:
+        count = model.rebuild_download_index(model.DOWNLOAD_DIR)
+        reporter.emit("rescan", folder=model.DOWNLOAD_DIR, indexed=count)
+    engine.restore_jobs()
+
+    started = time.time()
+    for url in read_urls(args.source):
+        if is_batch_url(url):
+            try:
+                _, entries = engine.list_batch(url)
+            except Exception as e:
+                reporter.emit("error", url=url, error=str(e))
+                continue
+            engine.resolve_batch(entries, args.resolution)
+        else:
+            engine.submit(url, args.resolution, clip=clip, precise_cuts=args.precise_cuts)
+
+    last_report = time.time()
+    while engine.has_active_jobs():
+        time.sleep(0.05)
+        if time.time() - last_report >= args.interval:
+            reporter.progress(engine.submitted_jobs())
+            last_report = time.time()
+
+    jobs = engine.submitted_jobs()
+    elapsed = time.time() - started
+    total_bytes = sum(j.bytes_transferred for j in jobs if j.status == j.DONE)
+    counts = {status: sum(1 for j in jobs if j.status == status) for status in ("done", "failed", "cancelled")}
+    counts["skipped"] = sum(1 for j in jobs if j.status == j.DONE and j.stage in ("already downloaded",
+                                                                                  "already queued"))
+    reporter.emit("summary", jobs=len(jobs), **counts, bytes=total_bytes, elapsed=round(elapsed, 3),
+                  throughput_bps=round(total_bytes / elapsed) if elapsed else 0)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,413 @@
+"""
+Client side of downloader_daemon.
+
+RemoteEngine offers the parts of DownloadEngine the window and the CLI
+use, backed by the daemon's HTTP API, so a front end can attach to the
+shared queue, detach and re-attach without interrupting any transfer.
+Jobs are mirrored locally from the daemon's event stream.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import uuid
+import urllib.request
+from downloader_cache import MetadataCache
+from downloader_engine import DownloadEngine, archive_key
+from downloader_metrics import Metrics
+from downloader_net import is_network_error
+from downloader_queue import DownloadJob
+
+# never send 127.0.0.1 traffic through an HTTP(S)_PROXY from the environment
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+class DaemonError(Exception):
+    """The daemon answered with an error, e.g. an extraction failure."""
+
+    def __init__(self, message, network=False):
+        super().__init__(message)
+        self.network = network  # the daemon classified it as a connectivity problem
+
+
+class DaemonClient:
+    def __init__(self, port, token, timeout=30):
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.token = token
+        self.timeout = timeout
+
+    @classmethod
+    def from_state_file(cls, path):
+        """Client for the daemon described by path, or None if it isn't running."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            client = cls(state["port"], state["token"])
+            client.request("GET", "/status", timeout=2)
+            return client
+        except (OSError, ValueError, KeyError, DaemonError):
+            return None
+
+    def request(self, method, path, body=None, timeout=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"X-Winbix-Token": self.token, "Content-Type": "application/json"})
+        try:
+            with _opener.open(req, timeout=timeout or self.timeout) as resp:
+                return json.loads(resp.read() or b"null")
+        except urllib.error.HTTPError as e:
+            try:
+                error = json.loads(e.read())
+            except ValueError:
+                error = {}
+            raise DaemonError(error.get("error") or f"daemon returned HTTP {e.code}",
+                              network=bool(error.get("network"))) from None
+
+    def stream(self, path):
+        req = urllib.request.Request(self.base_url + path, headers={"X-Winbix-Token": self.token})
+        return _opener.open(req, timeout=self.timeout)
+
+
+def start_daemon(model):
+    """Start `python -m downloader_daemon` detached from this process, logging to model.DAEMON_LOG."""
+    os.makedirs(os.path.dirname(model.DAEMON_LOG), exist_ok=True)
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    with open(model.DAEMON_LOG, "ab") as log:
+        subprocess.Popen([sys.executable, "-m", "downloader_daemon", "--port", str(model.DAEMON_PORT)],
+                         cwd=os.path.dirname(os.path.abspath(__file__)), stdin=subprocess.DEVNULL,
+                         stdout=log, stderr=subprocess.STDOUT, close_fds=True, **kwargs)
+
+
+def attach(model, spawn=True, timeout=10.0):
+    """DaemonClient for the running daemon, starting one if needed. None if that fails."""
+    client = DaemonClient.from_state_file(model.DAEMON_STATE_FILE)
+    if client is None and spawn:
+        start_daemon(model)
+        deadline = time.time() + timeout
+        while client is None and time.time() < deadline:
+            time.sleep(0.05)
+            client = DaemonClient.from_state_file(model.DAEMON_STATE_FILE)
+    return client
+
+
+def connect(model, spawn=True, timeout=10.0):
+    """RemoteEngine attached to the running daemon, starting one if needed. None if that fails."""
+    client = attach(model, spawn, timeout)
+    return RemoteEngine(model, client) if client else None
+
+
+# -----------------------
+# Local mirrors
+# -----------------------
+class RemoteJob:
+    QUEUED = DownloadJob.QUEUED
+    RUNNING = DownloadJob.RUNNING
+    DONE = DownloadJob.DONE
+    FAILED = DownloadJob.FAILED
+    CANCELLED = DownloadJob.CANCELLED
+
+    def __init__(self, data):
+        self.update(data)
+
+    def update(self, data):
+        self.__dict__.update(data)
+
+    @property
+    def is_active(self):
+        return self.status in (self.QUEUED, self.RUNNING)
+
+
+class RemoteQueue:
+    def __init__(self, engine):
+        self._engine = engine
+
+    def snapshot(self):
+        with self._engine._lock:
+            jobs = [self._engine._jobs[job_id] for job_id in sorted(self._engine._jobs)]
+            return self._engine._orphans + jobs
+
+    def cancel(self, job):
+        self._engine._job_request(job, "cancel")
+
+    def retry(self, job):
+        self._engine._job_request(job, "retry")
+
+
+class RemoteBandwidth:
+    def __init__(self, engine):
+        self._engine = engine
+        self.rate = None
+        self.schedule = []
+        self.following_schedule = False
+        self._aggregate = 0
+
+    def set_rate(self, rate):
+        self._update(self._engine._request("POST", "/bandwidth", {"rate": rate}))
+
+    def follow_schedule(self):
+        self._update(self._engine._request("POST", "/bandwidth", {"schedule": True}))
+
+    def _update(self, data):
+        self.rate = data.get("rate")
+        self.schedule = [tuple(entry) for entry in data.get("schedule") or []]
+        self.following_schedule = bool(data.get("following_schedule"))
+
+    def aggregate_rate(self):
+        return self._aggregate
+
+
+class RemoteConnectivity:
+    def __init__(self):
+        self.online = True
+        self._listeners = []
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def report_success(self):
+        pass  # the daemon's own monitor tracks connectivity
+
+    def report_failure(self, exc):
+        return getattr(exc, "network", False) or is_network_error(exc)
+
+    def _set_online(self, online):
+        if online == self.online:
+            return
+        self.online = online
+        for fn in list(self._listeners):
+            try:
+                fn(online)
+            except Exception as e:
+                print(f"Connectivity listener error: {e}")
+
+
+class RemoteEngine:
+    """
+    DownloadEngine stand-in that forwards to the daemon. Listeners only hear
+    about jobs submitted here. If the daemon goes away, the next request or
+    the event stream starts a new one, which resumes the unfinished jobs.
+    """
+
+    def __init__(self, model, client):
+        self.model = model
+        self.client = client
+        # the daemon writes the metadata cache; reading it here saves a round trip per LOAD
+        self.metadata_cache = MetadataCache(self.model.METADATA_CACHE_DIR,
+                                            ttl=self.model.METADATA_CACHE_TTL,
+                                            max_entries=self.model.METADATA_CACHE_MAX_ENTRIES)
+        # caches registered here (the window's thumbnail cache) are counted locally and
+        # pushed to the daemon, whose /metrics and log cover everything else
+        self.metrics = Metrics()
+        self.queue = RemoteQueue(self)
+        self.bandwidth = RemoteBandwidth(self)
+        self.connectivity = RemoteConnectivity()
+
+        self._lock = threading.Lock()
+        self._attach_lock = threading.Lock()
+        self._jobs = {}      # id -> RemoteJob, every job the daemon has
+        self._own = set()    # ids submitted through this engine
+        self._orphans = []   # our jobs that ended with an earlier daemon
+        self._listeners = []
+        self._closed = threading.Event()
+        self._stopped_client = None   # client of a daemon that was shut down on purpose
+        self._client_id = uuid.uuid4().hex
+        for data in self.client.request("GET", "/jobs"):
+            self._jobs[data["id"]] = RemoteJob(data)
+        threading.Thread(target=self._stream_loop, name="daemon-events", daemon=True).start()
+        threading.Thread(target=self._metrics_loop, name="daemon-metrics", daemon=True).start()
+
+    def add_listener(self, fn):
+        """fn(job) is called from the event thread whenever a job submitted here changes state."""
+        self._listeners.append(fn)
+
+    def close(self):
+        """Detach; the daemon and its transfers carry on."""
+        self._closed.set()
+        self._push_metrics()
+
+    # -----------------------
+    # Jobs
+    # -----------------------
+    def submit(self, url, resolution, title=None, info=None, option=None, on_duplicate=None, clip=None,
+               precise_cuts=False):
+        body = {"url": url, "resolution": resolution, "title": title, "info": info, "on_duplicate": on_duplicate,
+                "clip": clip, "precise_cuts": precise_cuts}
+        if option is not None:
+            body.update(format=option.format_spec, container=option.container)
+        data = self._request("POST", "/jobs", body)
+        with self._lock:
+            self._own.add(data["id"])
+        return self._apply_job(data)
+
+    def restore_jobs(self):
+        return []  # the daemon resumed unfinished jobs when it started
+
+    def has_active_jobs(self):
+        return any(j.is_active for j in self.submitted_jobs())
+
+    def submitted_jobs(self):
+        with self._lock:
+            return self._orphans + [self._jobs[job_id] for job_id in sorted(self._own) if job_id in self._jobs]
+
+    def set_priority(self, job, priority):
+        self._job_request(job, "priority", {"priority": priority})
+
+    def find_existing(self, info, audio_only=False):
+        key_fields = ("id", "extractor_key", "ie_key", "extractor")
+        if archive_key(info) is None:
+            return None
+        body = {"info": {k: info.get(k) for k in key_fields}, "audio_only": audio_only}
+        return self._request("POST", "/find-existing", body)["path"]
+
+    def _job_request(self, job, action, body=None):
+        if job in self._orphans:
+            raise DaemonError("That job belonged to a download daemon that has since stopped.")
+        self._apply_job(self._request("POST", f"/jobs/{job.id}/{action}", body or {}))
+
+    # -----------------------
+    # Metadata
+    # -----------------------
+    def load(self, url, use_cache=True):
+        # the daemon always checks its cache: a lookup in our local copy is never
+        # counted, so the daemon's is the one that shows up in its metrics
+        return self._request("POST", "/load", {"url": url}, timeout=300)
+
+    def list_batch(self, url):
+        data = self._request("POST", "/batch/list", {"url": url}, timeout=300)
+        return data["title"], [tuple(entry) for entry in data["entries"]]
+
+    # same bounded pool as in-process: load() and submit() just go through the daemon
+    resolve_batch = DownloadEngine.resolve_batch
+
+    # -----------------------
+    # Daemon connection
+    # -----------------------
+    def _request(self, method, path, body=None, timeout=None):
+        """client.request, re-attaching (and restarting the daemon) if it is gone. Raises DaemonError."""
+        client = self.client
+        try:
+            return client.request(method, path, body, timeout)
+        except OSError as e:
+            # a request is only repeated if its daemon is gone, so it cannot have run twice
+            if not self._reattach(client):
+                raise DaemonError(f"The download daemon is not running ({e}); see {self.model.DAEMON_LOG}") from None
+        try:
+            return self.client.request(method, path, body, timeout)
+        except OSError as e:
+            raise DaemonError(f"The download daemon is not responding ({e})") from None
+
+    def _reattach(self, failed_client):
+        """True if a different daemon than failed_client is attached now."""
+        with self._attach_lock:
+            if self.client is not failed_client:
+                return True  # another thread already re-attached
+            client = attach(self.model)
+            if client is None or client.token == failed_client.token:
+                return False
+            print("Download daemon restarted, re-attached")
+            self._adopt(client)
+            return True
+
+    def _adopt(self, client):
+        # the new daemon restored our unfinished jobs from its job file, under new ids
+        fresh = [RemoteJob(data) for data in client.request("GET", "/jobs")]
+        lost = []
+        with self._lock:
+            mine = [self._jobs[job_id] for job_id in sorted(self._own) if job_id in self._jobs]
+            self._jobs = {job.id: job for job in fresh}
+            self._own = set()
+            for old in mine:
+                match = next((job for job in fresh if job.is_active and job.id not in self._own
+                              and (job.url, job.resolution) == (old.url, old.resolution)), None)
+                if old.is_active and match is not None:
+                    self._own.add(match.id)
+                    continue
+                if old.is_active:
+                    old.status, old.error = old.FAILED, "lost when the download daemon stopped"
+                    lost.append(old)
+                self._orphans.append(old)
+            self.client = client
+        for job in lost:
+            self._notify(job)
+
+    # -----------------------
+    # Event stream
+    # -----------------------
+    def _stream_loop(self):
+        delay = 1.0
+        while not self._closed.is_set():
+            client = self.client
+            try:
+                with client.stream("/events") as resp:
+                    delay = 1.0
+                    for line in resp:
+                        if self._closed.is_set():
+                            return
+                        self._apply_event(json.loads(line))
+            except (OSError, ValueError):
+                pass
+            if self._closed.is_set():
+                return
+            if self._stopped_client is client:
+                # shut down on purpose: the next request starts a new daemon, not this loop
+                self._closed.wait(1.0)
+                continue
+            # daemon crashed: start a new one and carry on with it
+            if self.client is client and not self._reattach(client):
+                print(f"Daemon event stream lost, retrying in {delay:g}s")
+                self._closed.wait(delay)
+                delay = min(delay * 2, 30)
+
+    def _metrics_loop(self):
+        while not self._closed.wait(5):
+            self._push_metrics()
+
+    def _push_metrics(self):
+        caches = {name: [cache.hits, cache.misses] for name, cache in self.metrics.caches().items()}
+        if not caches:
+            return
+        try:
+            self.client.request("POST", "/metrics/caches", {"client": self._client_id, "caches": caches}, timeout=2)
+        except (OSError, DaemonError):
+            pass  # next push, or the stream loop, deals with a missing daemon
+
+    def _apply_event(self, event):
+        if event.get("stopping"):
+            self._stopped_client = self.client
+        for data in event.get("jobs", []):
+            self._apply_job(data)
+        if event.get("removed"):
+            with self._lock:
+                for job_id in event["removed"]:
+                    self._jobs.pop(job_id, None)
+                    self._own.discard(job_id)
+        self.bandwidth._update(event)
+        self.bandwidth._aggregate = event.get("aggregate_rate", 0)
+        self.connectivity._set_online(event.get("online", True))
+
+    def _apply_job(self, data):
+        with self._lock:
+            job = self._jobs.get(data["id"])
+            old_status = job.status if job else None
+            if job is None:
+                job = self._jobs[data["id"]] = RemoteJob(data)
+            else:
+                job.update(data)
+            notify = data["id"] in self._own and job.status != old_status
+        if notify:
+            self._notify(job)
+        return job
+
+    def _notify(self, job):
+        for fn in list(self._listeners):
+            try:
+                fn(job)
+            except Exception as e:
+                print(f"Job listener error: {e}")
@@ -1,51 +1,115 @@
 import threading
-import requests
-from io import BytesIO
-from yt_dlp import YoutubeDL
-from PIL import Image, ImageTk
 import os
 import sys
 import subprocess
-import time
+from concurrent.futures import ThreadPoolExecutor
+from downloader_cache import ThumbnailCache, cache_key
+from downloader_engine import DownloadEngine, clip_label, is_batch_url, is_video_url, parse_clip
+from downloader_formats import FormatIndex, is_audio_only, menu_label
+from downloader_queue import JobStore
+
+# yt_dlp, requests and PIL are imported where they are used: yt_dlp alone
+# pulls in hundreds of extractor modules, and the window should be up first.
+
+
+def warm_imports():
+    """Import the heavy libraries ahead of first use. Meant for a background thread."""
+    import yt_dlp  # noqa: F401
+    import requests  # noqa: F401
+    from PIL import ImageTk  # noqa: F401
+
 
 class VideoController:
     def __init__(self, model, view):
         self.model = model
         self.view = view
 
-        # Thumbnail cache 
-        self._thumb_cache = {}
-
-        # Cached internet state (updated by monitor thread)
-        self.internet_available = True
-        self._start_internet_monitor()
+        # Thumbnail cache: resized PNGs on disk, Tk images in a bounded LRU
+        self.thumb_cache = ThumbnailCache(self.model.THUMB_CACHE_DIR,
+                                          size=self.model.THUMB_SIZE,
+                                          max_bytes=self.model.THUMB_MEMORY_CACHE_BYTES)
+
+        # Metadata cache, connectivity and the job queue live in the UI-agnostic engine,
+        # normally inside the shared download daemon so closing the window keeps them going.
+        # Attaching may start the daemon, so it happens in the background once the window is up.
+        self.engine = None
+        self.queue = None
+        self.connectivity = None
+        self._engine_ready = threading.Event()
+        self.view.root.after_idle(lambda: threading.Thread(target=self._attach_engine, name="attach-engine",
+                                                           daemon=True).start())
 
         # Wire buttons
         self.view.load_btn.configure(command=self.load_video)
         self.view.download_btn.configure(command=self.download_video)
         self.view.history_btn.configure(command=self.show_history_popup)
-
-        # Download state
-        self._is_downloading = False
+        self.view.queue_btn.configure(command=self.show_queue_popup)
+
+        # Info dict from the last LOAD, handed to the download so it is not re-extracted
+        self._loaded_url = None
+        self._loaded_info = None
+        self._format_options = {}   # resolution menu label -> FormatOption
+
+        # Metadata and thumbnail are resolved speculatively while a URL sits in the entry
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+        self._prefetch = None          # (url, future) of the newest prefetch
+        self._prefetch_url = None      # set before the future exists, so its task can see it
+        self._prefetch_after = None
+        for sequence in ("<KeyRelease>", "<<Paste>>"):
+            self.view.entry.bind(sequence, self._on_entry_changed, add="+")
+
+        # Job whose progress the main bar shows
+        self._current_job = None
+
+        # Progress is rendered by one poller on the Tk loop, not per hook call
+        self.ui_events = 0
+        self._rendered = (None, None)
+        self.view.root.after(self.model.UI_FRAME_MS, self._poll_progress)
+
+    def _attach_engine(self):
+        """Background thread: attach to the daemon (or start one), or fall back to an in-process engine."""
+        engine = None
+        if self.model.USE_DAEMON:
+            from downloader_client import connect
+            try:
+                engine = connect(self.model)
+            except Exception as e:
+                print(f"Download daemon error: {e}")
+            if engine is None:
+                print("Download daemon unavailable, downloading in this process")
+        if engine is None:
+            # (yt-dlp console output stays on, as before, for debugging)
+            engine = DownloadEngine(self.model, verbose=True, job_store=JobStore(self.model.JOB_STATE_FILE))
+
+        engine.connectivity.add_listener(self._on_connectivity_change)
+        engine.add_listener(self._on_job_change)
+        engine.metrics.add_cache("thumbnail", self.thumb_cache)
+        self.engine, self.queue, self.connectivity = engine, engine.queue, engine.connectivity
+        self._engine_ready.set()
+
+        # Pick up downloads left unfinished when the app last closed
+        restored = engine.restore_jobs()
+        if restored:
+            self._ui(lambda: self.view.details_label.configure(
+                text=f"Resuming {len(restored)} unfinished download(s)..."))
+
+    def _wait_for_engine(self):
+        """The engine, once attached. Off the Tk thread only: the first calls may wait for the daemon."""
+        self._engine_ready.wait()
+        return self.engine
 
     # -----------------------
-    # Internet monitor
+    # Connectivity
     # -----------------------
-    def _start_internet_monitor(self):
-        def monitor():
-            while True:
-                try:
-                    requests.get("https://www.google.com", timeout=3)
-                    self.internet_available = True
-                except:
-                    self.internet_available = False
-                time.sleep(5)  # check every 5 seconds
-        t = threading.Thread(target=monitor, daemon=True)
-        t.start()
-
     def check_internet(self):
-        # fast check using cached value
-        return self.internet_available
+        # fast check using the state inferred from recent traffic; online until the engine knows better
+        return self.connectivity is None or self.connectivity.online
+
+    def _on_connectivity_change(self, online):
+        if online:
+            self._ui(lambda: self.view.details_label.configure(text="Back online."))
+        else:
+            self._ui(lambda: self.view.details_label.configure(text="No Internet - waiting for connection..."))
 
     # -----------------------
     # Thread-safe UI helpers
@@ -54,6 +118,105 @@ class VideoController:
         """Call fn(*args, **kwargs) safely on the Tk main thread."""
         self.view.root.after(0, lambda: fn(*args, **kwargs))
 
+    # -----------------------
+    # Progress rendering
+    # -----------------------
+    def _poll_progress(self):
+        """Render the focused job's progress at a fixed frame rate on the Tk thread."""
+        try:
+            job = self._current_job
+            if job is not None and job.status == job.RUNNING:
+                frame = (round(job.progress, 3), self._progress_text(job))
+                if frame != self._rendered:
+                    progress, text = frame
+                    if progress != self._rendered[0]:
+                        self.view.progress_bar.set(progress)
+                        self.ui_events += 1
+                    if text != self._rendered[1]:
+                        self.view.details_label.configure(text=text)
+                        self.ui_events += 1
+                    self._rendered = frame
+        finally:
+            self.view.root.after(self.model.UI_FRAME_MS, self._poll_progress)
+
+    def _progress_text(self, job):
+        speed_kbps = (job.speed or 0) / 1024
+        if job.stage == "processing":
+            return "Processing video..."
+        if job.stage == "error":
+            return "Download error occurred"
+        if job.stage != "downloading":
+            return f"Starting download: {job.title}"
+        # live rate across every active download
+        total_kbps = self.engine.bandwidth.aggregate_rate() / 1024
+        if job.total_bytes:
+            return f"Downloading {int(job.progress * 100)}% | {speed_kbps:.0f} KB/s | ETA: {job.eta}s | All: {total_kbps:.0f} KB/s"
+        # No total size available - show indeterminate progress
+        downloaded_mb = job.downloaded_bytes / (1024 * 1024)
+        return f"Downloading... {downloaded_mb:.1f} MB | {speed_kbps:.0f} KB/s | All: {total_kbps:.0f} KB/s"
+
+    def progress_stats(self):
+        """yt-dlp progress callbacks handled vs. widget updates actually posted to Tk."""
+        hook_calls = sum(j.hook_calls for j in self.queue.snapshot()) if self.queue else 0
+        return {"hook_calls": hook_calls, "ui_events": self.ui_events}
+
+    # -----------------------
+    # Speculative prefetch
+    # -----------------------
+    def _on_entry_changed(self, _event=None):
+        # debounce: only act once the field has been quiet for a moment
+        if self._prefetch_after is not None:
+            self.view.root.after_cancel(self._prefetch_after)
+        self._prefetch_after = self.view.root.after(self.model.PREFETCH_DEBOUNCE_MS, self._start_prefetch)
+
+    def _start_prefetch(self):
+        self._prefetch_after = None
+        url = self.view.entry.get().strip()
+        if self._prefetch and self._prefetch[0] == url:
+            return
+        if self._prefetch:
+            # superseded: drop it if it hasn't started; a running extraction can't be
+            # stopped, so it is abandoned and finishes into the metadata cache
+            self._prefetch[1].cancel()
+            self._prefetch = None
+        self._prefetch_url = url if is_video_url(url) and self.check_internet() else None
+        if self._prefetch_url:
+            self._prefetch = (url, self._prefetch_pool.submit(self._prefetch_task, url))
+
+    def _prefetch_task(self, url):
+        """Resolve metadata (into the metadata cache) and the thumbnail (into the thumbnail cache)."""
+        info = self._wait_for_engine().load(url)
+        thumb_url = info.get("thumbnail")
+        if thumb_url and self._prefetch_url == url:
+            thumb_key = info.get("id") or cache_key(thumb_url)
+            if self.thumb_cache.get(thumb_key) is None:
+                try:
+                    img = self.thumb_cache.fetch(thumb_url, thumb_key)
+                    self._ui(self._cache_thumbnail, thumb_key, img)
+                except Exception as e:
+                    print(f"Thumbnail prefetch error: {e}")
+        return info
+
+    def _prefetched_info(self, url, wait):
+        """Info from a prefetch of url, waiting for it if wait and it is already running."""
+        prefetch = self._prefetch
+        if prefetch is None or prefetch[0] != url or (not wait and not prefetch[1].done()):
+            return None
+        if prefetch[1].cancel():
+            # still queued behind abandoned prefetches: the caller loads it itself
+            return None
+        try:
+            return prefetch[1].result()
+        except Exception:
+            return None  # the caller loads it the usual way and reports the error
+
+    def _cache_thumbnail(self, key, img):
+        # UI thread: only wrap it for Tk, LOAD applies it
+        from PIL import ImageTk
+
+        if self.thumb_cache.get(key) is None:
+            self.thumb_cache.put(key, ImageTk.PhotoImage(img))
+
     # -----------------------
     # Load video info
     # -----------------------
@@ -64,54 +227,57 @@ class VideoController:
                 self._ui(self.view.show_message, "Error", "Please paste a YouTube URL.")
                 return
 
-            # quick offline check 
-            if not self.check_internet():
-                self._ui(self.view.show_message, "No Internet", "Cannot load video info while offline.")
+            engine = self._wait_for_engine()
+            if is_batch_url(url):
+                self._load_batch(url)
                 return
 
-            self._ui(lambda: self.view.details_label.configure(text="Loading video info..."))
+            # usually already resolved, or well under way, by the prefetch
+            info = self._prefetched_info(url, wait=True) or engine.metadata_cache.get(url)
+            if info is None:
+                # quick offline check 
+                if not self.check_internet():
+                    self._ui(self.view.show_message, "No Internet", "Cannot load video info while offline.")
+                    return
 
-            try:
-                with YoutubeDL({'quiet': True, 'skip_download': True}) as ydl:
-                    info = ydl.extract_info(url, download=False)
-            except Exception as e:
-                self._ui(lambda: self.view.details_label.configure(text=""))
-                self._ui(self.view.show_message, "Load Error", f"Enter a valid URL or try again.\n{str(e)}")
-                return
+                self._ui(lambda: self.view.details_label.configure(text="Loading video info..."))
+
+                try:
+                    info = engine.load(url, use_cache=False)  # missed the cache just above
+                except Exception as e:
+                    self._ui(lambda: self.view.details_label.configure(text=""))
+                    self._ui(self.view.show_message, "Load Error", f"Enter a valid URL or try again.\n{str(e)}")
+                    return
 
             title = info.get("title", "Unknown Title")
+            self._loaded_url, self._loaded_info = url, info
             self._ui(lambda: self.view.video_title.configure(text=title))
 
             # Thumbnail 
             thumb_url = info.get("thumbnail")
             if thumb_url:
-                if thumb_url in self._thumb_cache:
+                thumb_key = info.get("id") or cache_key(thumb_url)
+                tk_img = self.thumb_cache.get(thumb_key)
+                if tk_img is not None:
                     # apply cached image on UI thread
-                    self._ui(self._apply_thumbnail, self._thumb_cache[thumb_url])
+                    self._ui(self._apply_thumbnail, tk_img)
                 else:
-                    # download + cache in background
+                    # download/decode/resize in background, only PhotoImage creation on the UI thread
                     def thumb_task():
                         try:
-                            img_data = requests.get(thumb_url, timeout=8).content
-                            img = Image.open(BytesIO(img_data)).convert("RGBA")
-                            img.thumbnail((300, 200), Image.LANCZOS)
-                            tk_img = ImageTk.PhotoImage(img)
-                            self._thumb_cache[thumb_url] = tk_img
-                            self._ui(self._apply_thumbnail, tk_img)
-                        except Exception:
+                            img = self.thumb_cache.fetch(thumb_url, thumb_key)
+                            self._ui(self._show_thumbnail, thumb_key, img)
+                        except Exception as e:
+                            self.connectivity.report_failure(e)
                             self._ui(lambda: self.view.placeholder.configure(text="Thumbnail failed"))
                     threading.Thread(target=thumb_task, daemon=True).start()
             else:
                 self._ui(lambda: self.view.placeholder.configure(text="No thumbnail"))
 
-            # Formats / resolutions
-            formats = info.get("formats", [])
-            resolutions = sorted(
-                set(f"{f.get('height')}p" for f in formats if f.get("height") and f.get("acodec") != "none"),
-                key=lambda x: int(x.replace("p", "")) if x and x != "None" else 0
-            )
-            if not resolutions:
-                resolutions = ["original"]
+            # Formats / resolutions, each with the cheapest stream(s) for it and their size
+            options = FormatIndex(info).options()
+            self._format_options = {menu_label(opt): opt for opt in options}
+            resolutions = list(self._format_options) or ["original"]
             # update UI
             self._ui(lambda: self.view.res_menu.configure(values=resolutions))
             self._ui(lambda: self.view.res_var.set(resolutions[-1]))
@@ -119,6 +285,91 @@ class VideoController:
 
         threading.Thread(target=task, daemon=True).start()
 
+    # -----------------------
+    # Playlist / channel batch mode
+    # -----------------------
+    def _load_batch(self, url):
+        """List a playlist or channel flat (ids and titles only) and let the user pick entries."""
+        if not self.check_internet():
+            self._ui(self.view.show_message, "No Internet", "Cannot load a playlist while offline.")
+            return
+
+        self._ui(lambda: self.view.details_label.configure(text="Listing playlist..."))
+        try:
+            title, entries = self.engine.list_batch(url)
+        except Exception as e:
+            self._ui(lambda: self.view.details_label.configure(text=""))
+            self._ui(self.view.show_message, "Load Error", f"Could not list playlist.\n{str(e)}")
+            return
+
+        self._ui(lambda: self.view.video_title.configure(text=title))
+        self._ui(lambda: self.view.details_label.configure(text=f"Playlist: {len(entries)} videos"))
+        if entries:
+            self._ui(self.show_batch_popup, title, entries)
+
+    def show_batch_popup(self, playlist_title, entries):
+        import tkinter as tk
+        import customtkinter as ctk
+
+        popup = ctk.CTkToplevel(self.view.root)
+        popup.title(playlist_title)
+        popup.transient(self.view.root)
+        popup.configure(fg_color="#0E0C0C")
+
+        self.view.center(popup, 520, 460)
+
+        label = ctk.CTkLabel(popup, text=f"{len(entries)} videos - select the ones to download",
+                             text_color="white", font=("Arial", 13, "bold"))
+        label.pack(pady=(8, 4))
+
+        # A native Listbox stays fast with thousands of entries
+        list_frame = ctk.CTkFrame(popup, fg_color="#141212")
+        list_frame.pack(padx=10, pady=6, fill="both", expand=True)
+        scrollbar = tk.Scrollbar(list_frame)
+        scrollbar.pack(side="right", fill="y")
+        listbox = tk.Listbox(list_frame, selectmode=tk.EXTENDED, yscrollcommand=scrollbar.set,
+                             bg="#1A1A1A", fg="white", selectbackground="#5C899D",
+                             highlightthickness=0, borderwidth=0, activestyle="none")
+        listbox.pack(side="left", fill="both", expand=True)
+        scrollbar.config(command=listbox.yview)
+        for i, (_, title) in enumerate(entries, start=1):
+            listbox.insert("end", f"{i}. {title}")
+        listbox.select_set(0, "end")
+
+        res_var = ctk.StringVar(value=self.model.BATCH_DEFAULT_RESOLUTION)
+        res_menu = ctk.CTkOptionMenu(popup, values=["original", "1080p", "720p", "480p", "360p", "audio"],
+                                     variable=res_var, width=110)
+        res_menu.pack(side="left", padx=12, pady=8)
+
+        def start():
+            selected = [entries[i] for i in listbox.curselection()]
+            res = res_var.get()
+            popup.destroy()
+            if selected:
+                self.view.details_label.configure(text=f"Resolving {len(selected)} videos...")
+                threading.Thread(target=self._resolve_batch, args=(selected, res), daemon=True).start()
+
+        download_btn = ctk.CTkButton(popup, text="Download Selected", command=start)
+        download_btn.pack(side="right", padx=12, pady=8)
+
+        close_btn = ctk.CTkButton(popup, text="Close", command=popup.destroy, width=70)
+        close_btn.pack(side="right", padx=4, pady=8)
+
+    def _resolve_batch(self, entries, res):
+        failed = self.engine.resolve_batch(entries, res)
+        msg = f"Queued {len(entries)} videos."
+        if failed:
+            msg += f" ({failed} could not be resolved yet)"
+        self._ui(lambda: self.view.details_label.configure(text=msg))
+
+    def _show_thumbnail(self, key, img):
+        # runs on the UI thread: wrap the already-resized image for Tk
+        from PIL import ImageTk
+
+        tk_img = ImageTk.PhotoImage(img)
+        self.thumb_cache.put(key, tk_img)
+        self._apply_thumbnail(tk_img)
+
     def _apply_thumbnail(self, tk_img):
         # apply the Tk image to the placeholder 
         try:
@@ -128,163 +379,291 @@ class VideoController:
             pass
 
     # -----------------------
-    # Downloading - FIXED PROGRESS BAR
+    # Downloading - job queue
     # -----------------------
     def download_video(self):
-        if self._is_downloading:
-            self._ui(self.view.show_message, "Info", "A download is already in progress.")
+        url = self.view.entry.get().strip()
+        res = self.view.res_var.get()
+
+        if not url:
+            self.view.show_message("Error", "Load a video URL first.")
+            return
+
+        info, option = None, None
+        if url == self._loaded_url:
+            info, option = self._loaded_info, self._format_options.get(res)
+        else:
+            # DOWNLOAD without LOAD can still skip extraction if the prefetch finished
+            info = self._prefetched_info(url, wait=False)
+
+        try:
+            clip = parse_clip(self.view.clip_start.get(), self.view.clip_end.get(), (info or {}).get("duration"))
+        except ValueError as e:
+            self.view.show_message("Clip Error", str(e))
+            return
+        if clip:
+            # a clip is always fetched, even if the whole video is already on disk
+            self._submit(url, res, info, option, clip=clip, precise_cuts=self.view.precise_cuts_var.get())
+            return
+        if info is None:
+            self._submit(url, res, info, option)  # the download checks the index once the id is known
+            return
+
+        self._engine_call(lambda: self.engine.find_existing(info, is_audio_only(res)),
+                          on_done=lambda existing: self._confirm_download(url, res, info, option, existing))
+
+    def _confirm_download(self, url, res, info, option, existing):
+        """Queue the download, first asking what to do if the video is already on disk."""
+        if existing:
+            def on_choice(choice):
+                if choice == "Download Again":
+                    self._submit(url, res, info, option, on_duplicate="redownload")
+                elif choice == "Link Here":
+                    self._submit(url, res, info, option, on_duplicate="relink")
+                elif choice == "Open":
+                    self.open_file_from_history(existing)
+            # skip (Open / Skip), re-link into the current folder, or re-download
+            choices = ["Open", "Download Again", "Skip"]
+            if os.path.dirname(os.path.abspath(existing)) != os.path.abspath(self.model.DOWNLOAD_DIR):
+                choices.insert(1, "Link Here")
+            self.view.ask_choice("Already Downloaded", f"This video was already saved to:\n{existing}",
+                                 choices, on_choice)
+            return
+        self._submit(url, res, info, option)
+
+    def _submit(self, url, res, info, option, on_duplicate=None, clip=None, precise_cuts=False):
+        known = self.engine.submitted_jobs() if self.engine else []
+
+        def queued(job):
+            what = f"{job.title} ({clip_label(clip)})" if clip else job.title
+            if any(j is job for j in known):
+                # e.g. a double click: the engine hands back the job already downloading it
+                self.view.details_label.configure(text=f"Already in the queue: {what}")
+            elif self.check_internet():
+                self.view.details_label.configure(text=f"Queued: {what}")
+            else:
+                self.view.details_label.configure(text=f"Queued: {what} (starts when back online)")
+
+        self._engine_call(lambda: self.engine.submit(url, res, info=info, option=option, on_duplicate=on_duplicate,
+                                                     clip=clip, precise_cuts=precise_cuts),
+                          on_done=queued)
+
+    def _on_job_change(self, job):
+        """Called from worker threads whenever a job changes state."""
+        if job.status == job.RUNNING:
+            # the progress poller picks the new job up on its next frame
+            self._current_job = job
+            return
+
+        if job.status == job.DONE and job.stage == "already downloaded":
+            # found in the downloaded-video index, nothing was transferred
+            self._ui(lambda: self.view.details_label.configure(text=f"Already downloaded: {job.title}"))
+        elif job.status == job.DONE and job.stage == "already queued":
+            # another job turned out to be downloading the same video
+            self._ui(lambda: self.view.details_label.configure(text=f"Already in the queue: {job.title}"))
+        elif job.status == job.DONE:
+            self._ui(lambda: self.view.details_label.configure(text=f"Download completed: {job.title}"))
+            if not self._has_active_jobs():
+                self._ui(self.view.show_message, "Success", f"Video saved to:\n{job.file_path}")
+        elif job.status == job.FAILED:
+            self._ui(self.view.show_message, "Download Error", f"Download failed:\n{job.error}")
+            self._ui(lambda: self.view.details_label.configure(text=f"Download failed: {job.title}"))
+            print(f"Download error: {job.error}")  # Debug output
+        elif job.status == job.CANCELLED:
+            self._ui(lambda: self.view.details_label.configure(text=f"Download cancelled: {job.title}"))
+        else:
             return
 
+        if not self._has_active_jobs():
+            # Reset progress after delay
+            def reset_ui():
+                if self._has_active_jobs():
+                    return
+                self._ui(self.view.progress_bar.set, 0)
+                self._ui(lambda: self.view.details_label.configure(text=""))
+                self._rendered = (None, None)
+
+            threading.Timer(2.0, reset_ui).start()
+
+    def _has_active_jobs(self):
+        return self.engine is not None and self.engine.has_active_jobs()
+
+    def _engine_call(self, fn, *args, on_done=None, **kwargs):
+        """
+        Run a queue action for a Tk callback on a background thread: with the
+        daemon it is an HTTP request, which may have to restart the daemon.
+        on_done(result) then runs on the Tk thread; failures are reported there.
+        """
         def task():
-            self._is_downloading = True
-            url = self.view.entry.get().strip()
-            res = self.view.res_var.get()
-            
-            if not url:
-                self._ui(self.view.show_message, "Error", "Load a video URL first.")
-                self._is_downloading = False
+            self._wait_for_engine()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self._ui(self.view.show_message, "Download Error", f"The download service is not available:\n{e}")
                 return
+            if on_done is not None:
+                self._ui(on_done, result)
+        threading.Thread(target=task, daemon=True).start()
 
-            if not self.check_internet():
-                self._ui(self.view.show_message, "No Internet", "Cannot download while offline.")
-                self._is_downloading = False
-                return
+    # -----------------------
+    # Queue popup
+    # -----------------------
+    def show_queue_popup(self):
+        import customtkinter as ctk
 
-            # Reset UI state
-            self._ui(self.view.progress_bar.set, 0)
-            self._ui(lambda: self.view.details_label.configure(text="Preparing download..."))
+        if self.queue is None or not self.queue.snapshot():
+            self.view.show_message("Download Queue", "No downloads queued yet.")
+            return
 
-            # Get the selected resolution
-            res = self.view.res_var.get()
+        popup = ctk.CTkToplevel(self.view.root)
+        popup.title("Download Queue")
+        popup.transient(self.view.root)
+        popup.configure(fg_color="#0E0C0C")
 
-            if isinstance(res, str) and res.lower() == "original":
-                fmt = "best"
+        self.view.center(popup, 520, 420)
+
+        # Virtualized like the history popup: a fixed set of rows re-bound to the
+        # jobs in view, each widget touched only when what it shows has changed
+        list_frame = ctk.CTkFrame(popup, fg_color="#141212")
+        list_frame.pack(padx=10, pady=10, fill="both", expand=True)
+        list_frame.grid_columnconfigure(0, weight=1)
+
+        visible = self.model.QUEUE_VISIBLE_ROWS
+        state = {"offset": 0, "jobs": [], "scrollbar": None}
+
+        def job_at(i):
+            index = state["offset"] + i
+            return state["jobs"][index] if index < len(state["jobs"]) else None
+
+        # buttons are bound to a row, not a job; the job is looked up on click
+        def toggle_priority(i):
+            job = job_at(i)
+            if job is not None:
+                self._engine_call(self.engine.set_priority, job, 0 if job.priority else 1)
+
+        def act(i):
+            job = job_at(i)
+            if job is None:
+                return
+            if job.is_active:
+                self._engine_call(self.queue.cancel, job)
+            elif job.status == job.DONE:
+                if job.file_path:
+                    self.open_file_from_history(job.file_path)
             else:
-                try:
-                    height = int(str(res).replace("p", ""))
-                    # This format string is more likely to work
-                    fmt = f"bestvideo[height={height}]+bestaudio/best[height={height}]/bestvideo[height<={height}]+bestaudio/best[height<={height}]"
-                except:
-                    fmt = "best"
-            
-            # Force the system's Downloads folder
-            download_folder = os.path.join(os.path.expanduser("~"), "Downloads")
-            os.makedirs(download_folder, exist_ok=True)
-
-            # Progress tracking variables
-            last_update_time = 0
-            last_progress = 0
-
-            def progress_hook(d):
-                nonlocal last_update_time, last_progress
-                
-                if d['status'] == 'downloading':
-                    # Get progress information
-                    total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
-                    downloaded_bytes = d.get('downloaded_bytes', 0)
-                    
-                    if total_bytes and total_bytes > 0:
-                        progress = downloaded_bytes / total_bytes
-                        # Ensure progress doesn't go backwards
-                        progress = max(progress, last_progress)
-                        last_progress = progress
-                        
-                        # Update progress bar
-                        self._ui(self.view.progress_bar.set, progress)
-                        
-                        # Calculate speed and ETA
-                        speed = d.get('speed', 0)
-                        if speed:
-                            speed_kbps = speed / 1024
-                        else:
-                            speed_kbps = 0
-                            
-                        eta = d.get('eta', 0)
-                        
-                        # Update details 
-                        current_time = time.time()
-                        if current_time - last_update_time > 0.3:  # Update every 300ms
-                            self._ui(lambda: self.view.details_label.configure(
-                                text=f"Downloading {int(progress * 100)}% | {speed_kbps:.0f} KB/s | ETA: {eta}s"
-                            ))
-                            last_update_time = current_time
-                    
-                    else:
-                        # No total size available - show indeterminate progress
-                        speed = d.get('speed', 0)
-                        if speed:
-                            speed_kbps = speed / 1024
-                        else:
-                            speed_kbps = 0
-                            
-                        downloaded_mb = downloaded_bytes / (1024 * 1024)
-                        self._ui(lambda: self.view.details_label.configure(
-                            text=f"Downloading... {downloaded_mb:.1f} MB | {speed_kbps:.0f} KB/s"
-                        ))
-                
-                elif d['status'] == 'finished':
-                    self._ui(self.view.progress_bar.set, 1.0)
-                    self._ui(lambda: self.view.details_label.configure(text="Processing video..."))
-
-                elif d['status'] == 'error':
-                    self._ui(lambda: self.view.details_label.configure(text="Download error occurred"))
-                    self._is_downloading = False
-
-            ydl_opts = {
-                'format': fmt,
-                'outtmpl': os.path.join(download_folder, '%(title)s.%(ext)s'),
-                'progress_hooks': [progress_hook],
-                'merge_output_format': 'mp4',
-                'noprogress': False,  # Ensure progress is reported
-                'quiet': False,       # Set to False to see more debug info
-                'no_warnings': False,
-                "extractor_args": {"youtube": {"player_client": ["default"]}},
-            }
+                self._engine_call(self.queue.retry, job)
+
+        rows = []
+        for i in range(visible):
+            item_frame = ctk.CTkFrame(list_frame, fg_color="#1A1A1A")
+            item_frame.grid(row=i, column=0, sticky="ew", pady=3, padx=5)
+
+            label = ctk.CTkLabel(item_frame, text="", anchor="w", text_color="white", width=300)
+            label.grid(row=0, column=0, sticky="w", padx=10, pady=(5, 0))
+
+            bar = ctk.CTkProgressBar(item_frame, width=300, height=10, progress_color="#5C899D")
+            bar.grid(row=1, column=0, sticky="w", padx=10, pady=(2, 6))
+
+            priority_btn = ctk.CTkButton(item_frame, text="", width=60, command=lambda i=i: toggle_priority(i))
+            priority_btn.grid(row=0, column=1, rowspan=2, padx=(6, 0))
+
+            action_btn = ctk.CTkButton(item_frame, text="", width=70, command=lambda i=i: act(i))
+            action_btn.grid(row=0, column=2, rowspan=2, padx=6)
+
+            # last rendered values, as _poll_progress keeps for the main window
+            rows.append({"frame": item_frame, "label": label, "bar": bar, "priority": priority_btn,
+                         "action": action_btn, "shown": {}})
+
+        def show(row, key, value, apply):
+            if key not in row["shown"] or row["shown"][key] != value:
+                row["shown"][key] = value
+                apply(value)
+
+        def render():
+            jobs = state["jobs"] = self.queue.snapshot()
+            state["offset"] = max(0, min(state["offset"], len(jobs) - visible))
+            for i, row in enumerate(rows):
+                job = job_at(i)
+                show(row, "visible", job is not None,
+                     lambda v: row["frame"].grid() if v else row["frame"].grid_remove())
+                if job is None:
+                    continue
+                clip = f" [{clip_label(job.clip)}]" if job.clip else ""
+                show(row, "text", f"{job.id}. {job.title[:40]}{clip} - {job.status}",
+                     lambda v: row["label"].configure(text=v))
+                show(row, "progress", round(job.progress, 3), row["bar"].set)
+                show(row, "priority", bool(job.priority),
+                     lambda v: row["priority"].configure(text="High" if v else "Normal",
+                                                         fg_color="#9b6b2c" if v else None))
+                if job.is_active:
+                    action = ("Cancel", "normal")
+                elif job.status == job.DONE:
+                    action = ("Open", "normal" if job.file_path else "disabled")
+                else:
+                    action = ("Retry", "normal")
+                show(row, "action", action, lambda v: row["action"].configure(text=v[0], state=v[1]))
+
+            total = max(len(jobs), 1)
+            view = (state["offset"] / total, min(1.0, (state["offset"] + visible) / total))
+            if view != state["scrollbar"]:
+                state["scrollbar"] = view
+                scrollbar.set(*view)
+
+        def scroll_to(offset):
+            state["offset"] = max(0, min(int(offset), len(state["jobs"]) - visible))
+            render()
+
+        def on_scrollbar(*args):
+            if args[0] == "moveto":
+                scroll_to(float(args[1]) * len(state["jobs"]))
+            elif args[0] == "scroll":
+                step = visible if args[2] == "pages" else 1
+                scroll_to(state["offset"] + int(args[1]) * step)
+
+        scrollbar = ctk.CTkScrollbar(list_frame, command=on_scrollbar)
+        scrollbar.grid(row=0, column=1, rowspan=visible, sticky="ns")
+
+        def on_wheel(event):
+            if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+                scroll_to(state["offset"] - 1)
+            else:
+                scroll_to(state["offset"] + 1)
 
-            try:
-                self._ui(lambda: self.view.details_label.configure(text="Starting download..."))
-                
-                with YoutubeDL(ydl_opts) as ydl:
-                    # Extract info first to get filename
-                    info = ydl.extract_info(url, download=False)
-                    file_path = ydl.prepare_filename(info)
-                    
-                    # Now download
-                    ydl.download([url])
-                
-                # Record in history
-                try:
-                    if hasattr(self.model, 'add_to_history'):
-                        self.model.add_to_history(file_path)
-                    elif hasattr(self.model, 'download_history'):
-                        self.model.download_history.append(file_path)
-                except Exception as e:
-                    print(f"History error: {e}")
-                
-                # Success message
-                self._ui(lambda: self.view.details_label.configure(text="Download completed successfully!"))
-                self._ui(self.view.show_message, "Success", f"Video saved to:\n{file_path}")
-                
-                # Reset progress after delay
-                def reset_ui():
-                    self._ui(self.view.progress_bar.set, 0)
-                    self._ui(lambda: self.view.details_label.configure(text=""))
-                
-                threading.Timer(2.0, reset_ui).start()
-                
-            except Exception as e:
-                error_msg = str(e)
-                self._ui(self.view.show_message, "Download Error", f"Download failed:\n{error_msg}")
-                self._ui(lambda: self.view.details_label.configure(text="Download failed"))
-                self._ui(self.view.progress_bar.set, 0)
-                print(f"Download error: {error_msg}")  # Debug output
-            
-            finally:
-                self._is_downloading = False
+        # bound on the toplevel, so it fires over any row in the popup
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            popup.bind(sequence, on_wheel)
 
-        # Start download in separate thread
-        download_thread = threading.Thread(target=task, daemon=True)
-        download_thread.start()
+        def refresh():
+            if not popup.winfo_exists():
+                return
+            render()
+            popup.after(self.model.UI_FRAME_MS, refresh)
+
+        refresh()
+
+        # Global bandwidth budget, applied to running downloads immediately. A
+        # limit picked here overrides a configured schedule until "Schedule" is picked.
+        bandwidth = self.engine.bandwidth
+        limits = {"Unlimited": None, "512 KB/s": 512 * 1024, "1 MB/s": 1024 ** 2,
+                  "5 MB/s": 5 * 1024 ** 2, "10 MB/s": 10 * 1024 ** 2}
+        choices = (["Schedule"] if bandwidth.schedule else []) + list(limits)
+        if bandwidth.following_schedule:
+            current = "Schedule"
+        else:
+            current = next((k for k, v in limits.items() if v == bandwidth.rate), "Unlimited")
+
+        def set_limit(choice):
+            if choice == "Schedule":
+                self._engine_call(bandwidth.follow_schedule)
+            else:
+                self._engine_call(bandwidth.set_rate, limits[choice])
+
+        limit_var = ctk.StringVar(value=current)
+        limit_menu = ctk.CTkOptionMenu(popup, values=choices, variable=limit_var, width=120, command=set_limit)
+        limit_menu.pack(side="left", padx=12, pady=8)
+
+        close_btn = ctk.CTkButton(popup, text="Close", command=popup.destroy)
+        close_btn.pack(side="right", padx=12, pady=8)
 
     # -----------------------
     # History popup 
@@ -292,8 +671,7 @@ class VideoController:
     def show_history_popup(self):
         import customtkinter as ctk
 
-        history = list(self.model.get_history() or [])
-        if not history:
+        if not self.model.count_history():
             self.view.show_message("History", "No videos downloaded yet.")
             return
 
@@ -302,47 +680,130 @@ class VideoController:
         popup.transient(self.view.root)
         popup.configure(fg_color="#0E0C0C")
 
-        # Center window
-        popup_w, popup_h = 420, 360
-        self.view.root.update_idletasks()
-        root_x, root_y = self.view.root.winfo_x(), self.view.root.winfo_y()
-        root_w, root_h = self.view.root.winfo_width(), self.view.root.winfo_height()
-        pos_x = root_x + (root_w // 2) - (popup_w // 2)
-        pos_y = root_y + (root_h // 2) - (popup_h // 2)
-        popup.geometry(f"{popup_w}x{popup_h}+{pos_x}+{pos_y}")
+        self.view.center(popup, 420, 440)
 
         # Minimal offline banner
         if not self.check_internet():
             banner = ctk.CTkLabel(popup, text="⚠️ No Internet Connection", text_color="#ff4d4d", font=("Arial", 13, "bold"))
             banner.pack(pady=(6, 4))
 
-        # Scrollable area
-        scroll_frame = ctk.CTkScrollableFrame(popup, width=400, height=240, fg_color="#141212")
-        scroll_frame.pack(padx=10, pady=10, fill="both", expand=True)
+        search_var = ctk.StringVar()
+        search_entry = ctk.CTkEntry(popup, textvariable=search_var, placeholder_text="Search history...")
+        search_entry.pack(padx=10, pady=(10, 0), fill="x")
+
+        # Virtualized list: a fixed set of row widgets re-bound to whichever
+        # page of the history is in view, so row count never grows with history
+        list_frame = ctk.CTkFrame(popup, fg_color="#141212")
+        list_frame.pack(padx=10, pady=10, fill="both", expand=True)
+        list_frame.grid_columnconfigure(0, weight=1)
+
+        visible = self.model.HISTORY_VISIBLE_ROWS
+        state = {"offset": 0, "total": 0, "search": None, "search_after": None}
+        exists = {}  # path -> bool, filled by a background thread
+
+        rows = []
+        for i in range(visible):
+            item_frame = ctk.CTkFrame(list_frame, fg_color="#1A1A1A")
+            item_frame.grid(row=i, column=0, sticky="ew", pady=3, padx=5)
+            label = ctk.CTkLabel(item_frame, text="", anchor="w", text_color="white", width=280)
+            label.pack(side="left", padx=10, pady=3)
+            open_btn = ctk.CTkButton(item_frame, text="Open", width=50, state="disabled")
+            open_btn.pack(side="right", padx=6)
+            rows.append((item_frame, label, open_btn))
+
+        def scroll_to(offset):
+            state["offset"] = max(0, min(int(offset), state["total"] - visible))
+            render()
 
-        # Limit items to most recent 30 to avoid overload
-        MAX_ITEMS = 30
-        recent = history[-MAX_ITEMS:]
+        def on_scrollbar(*args):
+            if args[0] == "moveto":
+                scroll_to(float(args[1]) * state["total"])
+            elif args[0] == "scroll":
+                step = visible if args[2] == "pages" else 1
+                scroll_to(state["offset"] + int(args[1]) * step)
 
-        for i, path in enumerate(recent, start=max(1, len(history)-len(recent)+1)):
-            file_name = os.path.basename(path)
+        scrollbar = ctk.CTkScrollbar(list_frame, command=on_scrollbar)
+        scrollbar.grid(row=0, column=1, rowspan=visible, sticky="ns")
 
-            item_frame = ctk.CTkFrame(scroll_frame, fg_color="#1A1A1A")
-            item_frame.pack(fill="x", pady=5, padx=5)
+        def render():
+            if not popup.winfo_exists():
+                return
+            search = state["search"]
+            state["total"] = self.model.count_history(search)
+            state["offset"] = max(0, min(state["offset"], state["total"] - visible))
+            entries = self.model.get_history(search, state["offset"], visible)
+
+            unchecked = []
+            for i, (item_frame, label, open_btn) in enumerate(rows):
+                if i >= len(entries):
+                    item_frame.grid_remove()
+                    continue
+                _, title, path, _ = entries[i]
+                item_frame.grid()
+                label.configure(text=f"{state['offset'] + i + 1}. {title[:40]}")
+                if path not in exists:
+                    unchecked.append(path)
+                open_state = "normal" if exists.get(path) else "disabled"
+                open_btn.configure(state=open_state, command=lambda p=path: self.open_file_from_history(p))
+
+            total = max(state["total"], 1)
+            scrollbar.set(state["offset"] / total, min(1.0, (state["offset"] + visible) / total))
+
+            if unchecked:
+                def check_files():
+                    for path in unchecked:
+                        exists[path] = os.path.exists(path)
+                    self._ui(render)
+                threading.Thread(target=check_files, daemon=True).start()
+
+        def on_wheel(event):
+            if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+                scroll_to(state["offset"] - 3)
+            else:
+                scroll_to(state["offset"] + 3)
 
-            label = ctk.CTkLabel(item_frame, text=f"{i}. {file_name}", anchor="w", text_color="white")
-            label.pack(side="left", padx=10, pady=5)
+        # bound on the toplevel, so it fires over any row in the popup
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            popup.bind(sequence, on_wheel)
 
-            open_state = "normal" if os.path.exists(path) else "disabled"
-            open_btn = ctk.CTkButton(item_frame, text="Open", width=50, state=open_state,
-                                     command=lambda p=path: self.open_file_from_history(p))
-            open_btn.pack(side="right", padx=6)
+        def on_search(*_):
+            # debounce typing so each keystroke doesn't hit the database
+            if state["search_after"] is not None:
+                popup.after_cancel(state["search_after"])
+
+            def apply():
+                state["search"] = search_var.get().strip() or None
+                state["offset"] = 0
+                render()
+            state["search_after"] = popup.after(250, apply)
+
+        search_var.trace_add("write", on_search)
+        render()
+
+        def reset():
+            self.reset_history()
+            popup.destroy()
 
         # Reset & Close (use lightweight commands)
         reset_btn = ctk.CTkButton(popup, text="Reset History", fg_color="#9b2c2c",
-                                  hover_color="#b33636", command=self.reset_history)
+                                  hover_color="#b33636", command=reset)
         reset_btn.pack(side="left", padx=12, pady=8)
 
+        def rescan():
+            # re-sync the downloaded-video index with the download folder
+            def task():
+                try:
+                    count = self.model.rebuild_download_index(self.model.DOWNLOAD_DIR)
+                except Exception as e:
+                    print(f"Rescan error: {e}")
+                    return
+                self._ui(self.view.show_message, "Rescan Complete",
+                         f"{count} downloaded videos indexed.\nAlready-downloaded videos will be skipped.")
+            threading.Thread(target=task, daemon=True).start()
+
+        rescan_btn = ctk.CTkButton(popup, text="Rescan Folder", command=rescan)
+        rescan_btn.pack(side="left", padx=4, pady=8)
+
         close_btn = ctk.CTkButton(popup, text="Close", command=popup.destroy)
         close_btn.pack(side="right", padx=12, pady=8)
 
@@ -361,16 +822,8 @@ class VideoController:
             self._ui(self.view.show_message, "Error", f"Unable to open file.\n{e}")
 
     def reset_history(self):
-        # clear model history in a safe way
         try:
-            if hasattr(self.model, "reset_history"):
-                self.model.reset_history().clear()
-                self.show_history_popup.destroy()
-            else:
-                # fallback
-                if hasattr(self.model, "download_history"):
-                    self.model.download_history.clear()
-                    self.show_history_popup.destroy()
-        except Exception:
-            pass
+            self.model.reset_history()
+        except Exception as e:
+            print(f"History error: {e}")
         self._ui(self.view.show_message, "History Reset", "Your download history has been cleared.")
\ No newline at end of file
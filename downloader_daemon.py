@@ -0,0 +1,303 @@
+"""
+Background download daemon: one DownloadEngine (queue, workers, caches,
+bandwidth budget) shared by every window and CLI run on this machine.
+
+    python -m downloader_daemon [--port 47615]
+
+It serves a small JSON API on 127.0.0.1 and writes its port and access
+token to VideoModel.DAEMON_STATE_FILE; clients (downloader_client) read
+that file, so only processes of the same user can drive it. Requests must
+carry the token in an X-Winbix-Token header.
+
+    GET  /status                    pid, version, job counts
+    GET  /jobs                      every job
+    POST /jobs                      {url, resolution, title?, info?, format?, container?, on_duplicate?,
+                                     clip?, precise_cuts?}
+    POST /jobs/<id>/cancel | /retry | /priority {priority}
+    GET  /events                    JSON lines: changed jobs, ids of jobs dropped from the queue ("removed"),
+                                    connectivity and bandwidth, ~every UI frame;
+                                    a last {"stopping": true} line on shutdown
+    POST /load {url}                metadata (through the shared metadata cache)
+    POST /batch/list {url}          flat playlist / channel listing
+    POST /find-existing {info, audio_only}
+    POST /bandwidth {rate} | {schedule: true}   a fixed rate, or back to the configured schedule
+    GET  /metrics                   Prometheus text
+    POST /metrics/caches {client, caches: {name: [hits, misses]}}   counters of front-end caches
+    POST /shutdown
+"""
+import argparse
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from downloader_engine import DownloadEngine
+from downloader_formats import FormatOption
+from downloader_model import VideoModel
+from downloader_net import is_network_error
+from downloader_queue import JobStore
+
+API_VERSION = 1
+_JOB_ACTION_RE = re.compile(r"^/jobs/(\d+)/(cancel|retry|priority)$")
+
+
+class _ClientCaches:
+    """Hit/miss counters of one kind of front-end cache, summed over the clients that reported it."""
+
+    def __init__(self):
+        self.counts = {}   # client id -> (hits, misses), the latest totals it sent
+
+    @property
+    def hits(self):
+        return sum(hits for hits, _ in self.counts.values())
+
+    @property
+    def misses(self):
+        return sum(misses for _, misses in self.counts.values())
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # on Windows SO_REUSEADDR would let a second daemon bind the same port
+    allow_reuse_address = os.name != "nt"
+    daemon_threads = True
+
+
+class DaemonServer:
+    def __init__(self, engine, state_path, port, host="127.0.0.1"):
+        self.engine = engine
+        self.state_path = state_path
+        self.token = secrets.token_urlsafe(24)
+        self.stream_interval = engine.model.UI_FRAME_MS / 1000
+        self._stopped = threading.Event()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._dispatch(self, "GET")
+
+            def do_POST(self):
+                server._dispatch(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        # a fixed port doubles as the single-instance lock
+        self._httpd = _HTTPServer((host, port), Handler)
+
+    # -----------------------
+    # Lifecycle
+    # -----------------------
+    def serve_forever(self):
+        self._write_state()
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._stopped.set()
+            time.sleep(self.stream_interval * 2)  # event streams send their "stopping" line
+            self._httpd.server_close()
+            self._remove_state()
+
+    def shutdown(self):
+        self._stopped.set()
+        threading.Thread(target=self._httpd.shutdown, daemon=True).start()
+
+    def _write_state(self):
+        state = {"pid": os.getpid(), "port": self._httpd.server_address[1], "token": self.token,
+                 "version": API_VERSION}
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        if os.name != "nt":
+            os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.state_path)
+
+    def _remove_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                if json.load(f).get("pid") != os.getpid():
+                    return  # a newer daemon owns it
+            os.remove(self.state_path)
+        except (OSError, ValueError):
+            pass
+
+    # -----------------------
+    # Requests
+    # -----------------------
+    def _dispatch(self, handler, method):
+        if handler.headers.get("X-Winbix-Token") != self.token:
+            return self._reply(handler, 403, {"error": "bad token"})
+        path = handler.path.split("?")[0]
+        try:
+            body = self._read_body(handler) if method == "POST" else {}
+            if method == "GET" and path == "/events":
+                return self._stream_events(handler)
+            if method == "GET" and path == "/metrics":
+                return self._reply(handler, 200, self.engine.metrics.render(), "text/plain; version=0.0.4")
+            route = self._route(method, path)
+            if route is None:
+                return self._reply(handler, 404, {"error": f"no route for {method} {path}"})
+            self._reply(handler, 200, route(body))
+            if path == "/shutdown":
+                self.shutdown()  # only once the reply is out
+        except KeyError as e:
+            self._reply(handler, 400, {"error": f"missing {e}"})
+        except Exception as e:
+            # extraction failures and the like; the client re-raises them
+            self._reply(handler, 502, {"error": str(e), "network": is_network_error(e)})
+
+    def _route(self, method, path):
+        if method == "GET":
+            return {"/status": self._status, "/jobs": self._jobs}.get(path)
+        match = _JOB_ACTION_RE.match(path)
+        if match:
+            return lambda body: self._job_action(int(match.group(1)), match.group(2), body)
+        return {
+            "/jobs": self._submit,
+            "/load": lambda body: self.engine.load(body["url"]),
+            "/batch/list": self._list_batch,
+            "/find-existing": lambda body: {"path": self.engine.find_existing(body["info"],
+                                                                              body.get("audio_only", False))},
+            "/bandwidth": self._set_bandwidth,
+            "/metrics/caches": self._client_caches,
+            "/shutdown": lambda body: {"stopping": True},
+        }.get(path)
+
+    def _status(self, _body=None):
+        jobs = self.engine.queue.snapshot()
+        return {"pid": os.getpid(), "version": API_VERSION, "jobs": len(jobs),
+                "active": sum(1 for j in jobs if j.is_active)}
+
+    def _jobs(self, _body=None):
+        return [job.to_dict() for job in self.engine.queue.snapshot()]
+
+    def _submit(self, body):
+        option = None
+        if body.get("format"):
+            option = FormatOption(body["resolution"], body["format"], body.get("container"), None, False)
+        job = self.engine.submit(body["url"], body["resolution"], title=body.get("title"), info=body.get("info"),
+                                 option=option, on_duplicate=body.get("on_duplicate"), clip=body.get("clip"),
+                                 precise_cuts=body.get("precise_cuts", False))
+        return job.to_dict()
+
+    def _job_action(self, job_id, action, body):
+        job = next((j for j in self.engine.queue.snapshot() if j.id == job_id), None)
+        if job is None:
+            raise KeyError(f"job {job_id}")
+        if action == "cancel":
+            self.engine.queue.cancel(job)
+        elif action == "retry":
+            self.engine.queue.retry(job)
+        else:
+            self.engine.set_priority(job, int(body["priority"]))
+        return job.to_dict()
+
+    def _list_batch(self, body):
+        title, entries = self.engine.list_batch(body["url"])
+        return {"title": title, "entries": entries}
+
+    def _set_bandwidth(self, body):
+        if body.get("schedule"):
+            self.engine.bandwidth.follow_schedule()
+        else:
+            self.engine.bandwidth.set_rate(body.get("rate"))
+        return self._bandwidth_state()
+
+    def _bandwidth_state(self):
+        bandwidth = self.engine.bandwidth
+        return {"rate": bandwidth.rate, "schedule": bandwidth.schedule,
+                "following_schedule": bandwidth.following_schedule}
+
+    def _client_caches(self, body):
+        registered = self.engine.metrics.caches()
+        for name, (hits, misses) in body["caches"].items():
+            caches = registered.get(name)
+            if caches is None:
+                caches = _ClientCaches()
+                self.engine.metrics.add_cache(name, caches)
+            if isinstance(caches, _ClientCaches):  # never overwrite the daemon's own caches
+                caches.counts[body["client"]] = (hits, misses)
+        return {}
+
+    def _stream_events(self, handler):
+        """Changed jobs as JSON lines until the client goes away; attaching never touches the transfers."""
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Cache-Control", "no-store")
+        handler.end_headers()
+        handler.close_connection = True
+
+        sent = {}
+        last_extra = None
+        while not self._stopped.is_set():
+            jobs = []
+            snapshot = self.engine.queue.snapshot()
+            for job in snapshot:
+                data = job.to_dict()
+                if sent.get(job.id) != data:
+                    sent[job.id] = data
+                    jobs.append(data)
+            # finished jobs the queue has let go of
+            removed = sorted(sent.keys() - {job.id for job in snapshot})
+            for job_id in removed:
+                del sent[job_id]
+            extra = {"online": self.engine.connectivity.online, **self._bandwidth_state(),
+                     "aggregate_rate": round(self.engine.bandwidth.aggregate_rate())}
+            if jobs or removed or extra != last_extra:
+                last_extra = extra
+                try:
+                    event = {"jobs": jobs, "removed": removed, **extra}
+                    handler.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+                    handler.wfile.flush()
+                except OSError:
+                    return  # client detached
+            time.sleep(self.stream_interval)
+        try:
+            # a deliberate stop: clients shouldn't start a new daemon until they need one
+            handler.wfile.write(b'{"jobs": [], "stopping": true}\n')
+        except OSError:
+            pass
+
+    @staticmethod
+    def _read_body(handler):
+        length = int(handler.headers.get("Content-Length") or 0)
+        return json.loads(handler.rfile.read(length) or b"{}") if length else {}
+
+    @staticmethod
+    def _reply(handler, status, data, content_type="application/json"):
+        body = (data if isinstance(data, str) else json.dumps(data)).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m downloader_daemon", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=VideoModel.DAEMON_PORT)
+    args = parser.parse_args(argv)
+
+    model = VideoModel()
+    engine = DownloadEngine(model, job_store=JobStore(model.JOB_STATE_FILE))
+    try:
+        server = DaemonServer(engine, model.DAEMON_STATE_FILE, args.port)
+    except OSError as e:
+        print(f"Daemon not started, port {args.port} is taken (already running?): {e}", file=sys.stderr)
+        return 1
+
+    restored = engine.restore_jobs()
+    print(f"Download daemon on 127.0.0.1:{args.port}, {len(restored)} unfinished job(s) resumed")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,575 @@
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from downloader_bandwidth import BandwidthScheduler
+from downloader_cache import MetadataCache
+from downloader_formats import FormatIndex, is_audio_only, parse_height
+from downloader_metrics import Metrics
+from downloader_net import ConnectivityMonitor
+from downloader_queue import DownloadJob, DownloadQueue
+
+_BATCH_URL_RE = re.compile(r"youtube\.com/(playlist\?|channel/|c/|user/|@)")
+_VIDEO_URL_RE = re.compile(r"^https?://(www\.|m\.|music\.)?"
+                           r"(youtube\.com/(watch\?(.*&)?v=|shorts/|live/|embed/)|youtu\.be/)[\w-]{11}")
+_CHANNEL_ROOT_RE = re.compile(r"youtube\.com/(channel/[^/?#]+|c/[^/?#]+|user/[^/?#]+|@[^/?#]+)/?$")
+_CLIP_TIME_RE = re.compile(r"^(?:(?:(\d+):)?(\d+):)?(\d+(?:\.\d+)?)$")
+
+
+def is_batch_url(url):
+    """Playlist and channel URLs; a watch URL with a list= parameter still means one video."""
+    return bool(_BATCH_URL_RE.search(url))
+
+
+def is_video_url(url):
+    """A complete single-video YouTube URL, worth resolving before anyone asks."""
+    return bool(_VIDEO_URL_RE.match(url)) and not is_batch_url(url)
+
+
+def parse_clip_time(text):
+    """Seconds for "95", "1:35" or "1:01:35.5"; None for an empty field. Raises ValueError."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    match = _CLIP_TIME_RE.match(text)
+    if not match:
+        raise ValueError(f"Not a time: {text!r} (use seconds, m:ss or h:mm:ss)")
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds)
+
+
+def parse_clip(start_text, end_text, duration=None):
+    """
+    (start, end) seconds from the clip fields, end None meaning "to the end",
+    or None when they cover the whole video. Raises ValueError.
+    """
+    start, end = parse_clip_time(start_text), parse_clip_time(end_text)
+    if start is None and end is None:
+        return None
+    start = start or 0
+    if end is not None and end <= start:
+        raise ValueError("The clip must end after it starts.")
+    if duration:
+        if start >= duration:
+            raise ValueError(f"The clip starts after the end of the video ({duration:g}s).")
+        if end is not None and end >= duration:
+            end = None
+    if start == 0 and end is None:
+        return None  # e.g. "0" to "": the whole video, downloaded normally
+    return start, end
+
+
+def clip_label(clip):
+    """"95s-215s" or "95s-end"; also used in file names, so no colons."""
+    start, end = clip
+    return f"{start:g}s-" + ("end" if end is None else f"{end:g}s")
+
+
+def archive_key(info, audio_only=False):
+    """
+    (extractor, video id) identifying a video across URLs, as in yt-dlp's
+    download archive. Audio-only downloads are indexed as "<id>:audio".
+    """
+    extractor = info.get("extractor_key") or info.get("ie_key") or info.get("extractor") or ""
+    video_id = info.get("id")
+    if not video_id:
+        return None
+    return extractor.lower(), f"{video_id}:audio" if audio_only else video_id
+
+
+class AlreadyDownloaded(Exception):
+    """Raised inside a download to stop it before any media is transferred."""
+
+
+class DownloadEngine:
+    """
+    UI-agnostic download logic: metadata loading and caching, connectivity
+    tracking and the job queue. The Tk controller and the headless CLI are
+    both thin front ends over it and only observe jobs through listeners.
+    """
+
+    def __init__(self, model, workers=None, verbose=False, job_store=None):
+        self.model = model
+        self.verbose = verbose
+        # Optional JobStore; unfinished jobs are saved there and can be restored
+        self.job_store = job_store
+
+        # Persistent extract_info cache, survives restarts
+        self.metadata_cache = MetadataCache(self.model.METADATA_CACHE_DIR,
+                                            ttl=self.model.METADATA_CACHE_TTL,
+                                            max_entries=self.model.METADATA_CACHE_MAX_ENTRIES)
+
+        # Per-job phase timings: JSON-lines log, optional localhost endpoint
+        self.metrics = Metrics(self.model.METRICS_LOG)
+        self.metrics.add_cache("metadata", self.metadata_cache)
+        if self.model.METRICS_PORT:
+            try:
+                self.metrics.serve(self.model.METRICS_PORT)
+            except OSError as e:
+                print(f"Metrics endpoint error: {e}")
+
+        # Connectivity inferred from real traffic; probes only while offline
+        self.connectivity = ConnectivityMonitor(self.model.CONNECTIVITY_PROBE_URL)
+
+        # One bytes/sec budget shared by all active downloads
+        self.bandwidth = BandwidthScheduler(self.model.BANDWIDTH_LIMIT, self.model.BANDWIDTH_SCHEDULE)
+
+        # Download queue drained by a pool of worker threads
+        self._listeners = []
+        self._claim_lock = threading.Lock()   # one active job per video and output file
+        self.queue = DownloadQueue(self.run_job, workers=workers or self.model.MAX_CONCURRENT_DOWNLOADS,
+                                   on_change=self._job_changed, connectivity=self.connectivity,
+                                   postprocess_workers=self.model.POSTPROCESS_WORKERS,
+                                   network_retries=self.model.NETWORK_RETRIES,
+                                   max_finished=self.model.FINISHED_JOBS_KEPT)
+
+    def add_listener(self, fn):
+        """fn(job) is called from worker threads whenever a job changes state."""
+        self._listeners.append(fn)
+
+    def _job_changed(self, job):
+        self._save_jobs()
+        if not job.is_active:
+            self.metrics.record_job(job)
+        for fn in list(self._listeners):
+            fn(job)
+
+    def _save_jobs(self):
+        if self.job_store is not None:
+            self.job_store.save(self.queue.snapshot())
+
+    def restore_jobs(self):
+        """Re-queue the unfinished jobs saved by a previous run. Returns them."""
+        if self.job_store is None:
+            return []
+        return [self.queue.add(DownloadJob.from_state(state)) for state in self.job_store.load()]
+
+    def submit(self, url, resolution, title=None, info=None, option=None, on_duplicate=None, clip=None,
+               precise_cuts=False):
+        """
+        Queue a download. option is a FormatOption picked from the format menu;
+        on_duplicate overrides model.DUPLICATE_POLICY for this job. clip is a
+        (start, end) window from parse_clip to fetch instead of the whole video.
+        If the same video is already queued or downloading, that job is
+        returned instead of starting a second transfer to the same file.
+        """
+        job = DownloadJob(url, resolution, title, info)
+        if option is not None:
+            job.format = option.format_spec
+            job.container = option.container
+        job.on_duplicate = on_duplicate
+        job.clip = tuple(clip) if clip else None
+        job.precise_cuts = precise_cuts
+        key = archive_key(info, is_audio_only(resolution)) if info else None
+        with self._claim_lock:
+            active = self._active_duplicate(job, key)
+            if active is not None:
+                return active
+            job.video_key = key
+            return self.queue.add(job)
+
+    def find_existing(self, info, audio_only=False):
+        """Path of an earlier download of the video info describes, if the file is still there."""
+        key = archive_key(info, audio_only)
+        path = self.model.find_download(*key) if key else None
+        if path and not os.path.exists(path):
+            self.model.forget_download(*key)
+            return None
+        return path
+
+    def has_active_jobs(self):
+        return any(j.is_active for j in self.queue.snapshot())
+
+    def submitted_jobs(self):
+        # every job in-process; a RemoteEngine only returns its own
+        return self.queue.snapshot()
+
+    def set_priority(self, job, priority):
+        # read by the bandwidth scheduler on the job's next progress callback
+        job.priority = priority
+        self._save_jobs()
+
+    # -----------------------
+    # Metadata
+    # -----------------------
+    def ydl_opts(self, **extra):
+        """Options shared by every YoutubeDL instance so loading and downloading see the same formats."""
+        opts = {
+            "extractor_args": {"youtube": {"player_client": ["default"]}},
+            "noplaylist": True,
+        }
+        opts.update(extra)
+        return opts
+
+    def load(self, url, use_cache=True):
+        """
+        Info dict for url, from the metadata cache or a fresh extraction. Raises
+        on failure. use_cache=False is for callers that just missed the cache
+        themselves, so the lookup isn't counted twice.
+        """
+        info = self.metadata_cache.get(url) if use_cache else None
+        if info is not None:
+            return info
+        try:
+            info = self.extract_info(url)
+        except Exception as e:
+            self.connectivity.report_failure(e)
+            raise
+        self.connectivity.report_success()
+        return info
+
+    def extract_info(self, url):
+        """Extract metadata without downloading and store it in the metadata cache."""
+        from yt_dlp import YoutubeDL
+
+        with YoutubeDL(self.ydl_opts(quiet=True, skip_download=True)) as ydl:
+            info = ydl.extract_info(url, download=False)
+        info = YoutubeDL.sanitize_info(info, remove_private_keys=True)
+        self.metadata_cache.put(url, info)
+        return info
+
+    # -----------------------
+    # Playlist / channel batch mode
+    # -----------------------
+    def list_batch(self, url):
+        """List a playlist or channel flat (ids and titles only). Returns (title, [(url, title), ...])."""
+        from yt_dlp import YoutubeDL
+
+        # a bare channel URL lists its tabs; go straight to the uploads
+        if _CHANNEL_ROOT_RE.search(url):
+            url = url.rstrip("/") + "/videos"
+
+        try:
+            with YoutubeDL(self.ydl_opts(quiet=True, skip_download=True, extract_flat="in_playlist",
+                                         noplaylist=False)) as ydl:
+                listing = ydl.extract_info(url, download=False)
+        except Exception as e:
+            self.connectivity.report_failure(e)
+            raise
+        self.connectivity.report_success()
+
+        entries = []
+        for entry in listing.get("entries") or []:
+            if not entry or not entry.get("id"):
+                continue
+            entry_url = entry.get("url") or f"https://www.youtube.com/watch?v={entry['id']}"
+            entries.append((entry_url, entry.get("title") or entry["id"]))
+        return listing.get("title", "Playlist"), entries
+
+    def resolve_batch(self, entries, res):
+        """
+        Resolve full metadata for entries on a bounded pool and enqueue each
+        one as soon as its info is ready, so the first download starts while
+        the rest are still resolving. Returns the number that failed to resolve.
+        """
+        failed = 0
+        with ThreadPoolExecutor(max_workers=self.model.METADATA_WORKERS) as pool:
+            futures = {pool.submit(self.load, url): (url, title) for url, title in entries}
+            for future in as_completed(futures):
+                url, title = futures[future]
+                try:
+                    info = future.result()
+                except Exception:
+                    # still enqueue it; the download does its own extraction
+                    info = None
+                    failed += 1
+                self.submit(url, res, title=title, info=info)
+        return failed
+
+    # -----------------------
+    # Downloading
+    # -----------------------
+    def run_job(self, job):
+        """
+        Download one job. Runs on a queue worker thread; raises on failure.
+        Returns the job's post-processing (merge, remux, fixups) as a callable
+        for the queue's post-processing pool instead of running it here.
+        """
+        from yt_dlp import YoutubeDL
+        from yt_dlp.utils import DownloadCancelled
+
+        # the index is checked before any network traffic when the info is at hand
+        known_info = job.info or self.metadata_cache.get(job.url)
+        if known_info is not None and (not self._claim_video(job, known_info)
+                                       or self._reuse_existing(job, known_info)):
+            return None
+
+        # pinned before any transfer so a resumed job asks for the same formats;
+        # the hook can't do it, its info dict names one stream of a merged pair
+        job.format, job.container = self._select_format(job)
+
+        # Force the system's Downloads folder
+        download_folder = self.model.DOWNLOAD_DIR
+        os.makedirs(download_folder, exist_ok=True)
+
+        last_saved = time.time()
+        first_byte_at = None
+        seen_bytes = {}  # filename -> downloaded_bytes already charged to the bandwidth budget
+        fetched = {}     # filename -> bytes actually received by this run (not a resumed .part)
+
+        def progress_hook(d):
+            # Runs once per yt-dlp callback, so it only records state;
+            # front ends poll the job to decide when to render it.
+            nonlocal last_saved, first_byte_at
+            job.hook_calls += 1
+
+            if job.cancelled:
+                raise DownloadCancelled()
+
+            if job.output_path is None:
+                # pin the final path the first time yt-dlp reports it
+                job.output_path = (d.get('info_dict') or {}).get('_filename')
+                self._save_jobs()
+
+            now = time.time()
+            if now - last_saved > self.model.JOB_STATE_SAVE_INTERVAL:
+                last_saved = now
+                self._save_jobs()
+
+            if d['status'] == 'downloading':
+                if first_byte_at is None:
+                    first_byte_at = now
+                    job.timings["ttfb"] = now - job.started_at - job.timings.get("extraction", 0)
+                total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
+                downloaded_bytes = d.get('downloaded_bytes', 0)
+
+                # the first report of a file may be a resume offset, so it only sets the baseline
+                filename = d.get('filename')
+                delta = downloaded_bytes - seen_bytes.setdefault(filename, downloaded_bytes)
+                seen_bytes[filename] = downloaded_bytes
+                fetched[filename] = fetched.get(filename, 0) + delta
+                # blocks this download's read loop while over the global budget
+                self.bandwidth.consume(delta, job.priority, job.cancel_event)
+
+                job.stage = "downloading"
+                job.downloaded_bytes = downloaded_bytes
+                job.total_bytes = total_bytes
+                job.speed = d.get('speed') or 0
+                job.eta = d.get('eta')
+                if total_bytes and total_bytes > 0:
+                    # Ensure progress doesn't go backwards
+                    job.progress = max(downloaded_bytes / total_bytes, job.progress)
+
+            elif d['status'] == 'finished':
+                # merged formats finish once per stream; a file that was already
+                # complete finishes without ever downloading and adds nothing
+                filename = d.get('filename')
+                if filename in seen_bytes:
+                    final_bytes = d.get('downloaded_bytes') or d.get('total_bytes') or seen_bytes[filename]
+                    fetched[filename] = fetched.get(filename, 0) + max(final_bytes - seen_bytes[filename], 0)
+                job.bytes_transferred += fetched.pop(filename, 0)
+                job.progress = 1.0
+                job.stage = "processing"
+
+            elif d['status'] == 'error':
+                job.stage = "error"
+
+        extra = {}
+        if is_audio_only(job.resolution) and self._ffmpeg_available():
+            # stream copy: AAC stays .m4a, Opus leaves its WebM container for .opus
+            extra["postprocessors"] = [{"key": "FFmpegExtractAudio", "preferredcodec": "best"}]
+        if job.clip:
+            from yt_dlp.utils import download_range_func
+
+            # yt-dlp hands sections to ffmpeg, which seeks and reads only the
+            # fragments / byte ranges covering the window (no ffmpeg: the job fails)
+            start, end = job.clip
+            extra["download_ranges"] = download_range_func(None, [(start, float("inf") if end is None else end)])
+            # re-encodes around the cuts; otherwise they snap to the nearest keyframes
+            extra["force_keyframes_at_cuts"] = job.precise_cuts
+
+        if job.output_path:
+            outtmpl = job.output_path.replace('%', '%%')
+        elif job.clip:
+            outtmpl = os.path.join(download_folder, self.model.CLIP_OUTPUT_TEMPLATE.format(clip=clip_label(job.clip)))
+        elif is_audio_only(job.resolution):
+            outtmpl = os.path.join(download_folder, self.model.AUDIO_OUTPUT_TEMPLATE)
+        else:
+            outtmpl = os.path.join(download_folder, self.model.OUTPUT_TEMPLATE)
+
+        ydl_opts = self.ydl_opts(
+            format=job.format,
+            outtmpl=outtmpl,
+            progress_hooks=[progress_hook],
+            continuedl=True,   # resume from .part files
+            concurrent_fragment_downloads=self.model.FRAGMENT_CONCURRENCY,
+            merge_output_format=job.container or 'mp4',
+            noprogress=not self.verbose,
+            quiet=not self.verbose,
+            no_warnings=not self.verbose,
+            **extra,
+        )
+
+        deferred = []
+
+        def defer_post_process(filename, info, files_to_move=None):
+            # yt-dlp calls this once the streams are on disk; keep the work for later
+            info['filepath'] = filename
+            # a copy, since yt-dlp strips keys from its own dict afterwards
+            deferred.append((filename, dict(info), files_to_move))
+            return info
+
+        try:
+            with YoutubeDL(ydl_opts) as ydl:
+                ydl.post_process = defer_post_process
+                info = self._download_info(ydl, job)
+        except AlreadyDownloaded:
+            return None
+
+        if first_byte_at is not None:
+            job.timings["transfer"] = time.time() - first_byte_at
+        job.title = info.get("title", job.title)
+
+        def finish():
+            started = time.time()
+            for filename, pp_info, files_to_move in deferred:
+                pp_info = YoutubeDL.post_process(ydl, filename, pp_info, files_to_move)
+                job.file_path = pp_info.get('filepath') or filename
+            if job.file_path is None:
+                job.file_path = ydl.prepare_filename(info)
+            job.timings["merge"] = time.time() - started
+
+            # Record in history and the downloaded-video index. History keeps the
+            # index id ("<id>:audio" for audio-only) for rescans. A clip is not the
+            # video: it stays out of the index, and its history row has no id.
+            try:
+                key = None if job.clip else archive_key(info, is_audio_only(job.resolution))
+                self.model.add_to_history(job.file_path, video_id=key[1] if key else None, title=job.title)
+                if key:
+                    self.model.record_download(*key, job.file_path, format=info.get("format_id"))
+            except Exception as e:
+                print(f"History error: {e}")
+
+        return finish
+
+    def _active_duplicate(self, job, key):
+        """Another active job writing the same file as job: same video (or URL and resolution) and clip."""
+        for other in self.queue.snapshot():
+            if other is job or not other.is_active or other.clip != job.clip:
+                continue
+            same_video = key is not None and other.video_key == key
+            if same_video or (other.url, other.resolution) == (job.url, job.resolution):
+                return other
+        return None
+
+    def _claim_video(self, job, info):
+        """
+        Record the video job downloads, now that its id is known. False, with
+        the job marked, if another active job already has the same video.
+        """
+        key = archive_key(info, is_audio_only(job.resolution))
+        with self._claim_lock:
+            other = self._active_duplicate(job, key)
+            if other is None:
+                job.video_key = key
+                return True
+        job.title = info.get("title", job.title)
+        job.stage = "already queued"
+        job.progress = 1.0
+        return False
+
+    def _reuse_existing(self, job, info):
+        """
+        Apply the job's duplicate policy. True if an earlier download was
+        reused (and the job needs no transfer), False to download as usual.
+        """
+        policy = job.on_duplicate or self.model.DUPLICATE_POLICY
+        if policy == "redownload" or job.clip:
+            return False
+        path = self.find_existing(info, is_audio_only(job.resolution))
+        if path is None:
+            return False
+
+        if policy == "relink" and os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.model.DOWNLOAD_DIR):
+            # give the current download folder its own entry for the same file, without the transfer
+            target = os.path.join(self.model.DOWNLOAD_DIR, os.path.basename(path))
+            if not os.path.exists(target):
+                os.makedirs(self.model.DOWNLOAD_DIR, exist_ok=True)
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copy2(path, target)  # other volume, or no hard links
+                key = archive_key(info, is_audio_only(job.resolution))
+                self.model.add_to_history(target, video_id=key[1] if key else None, title=info.get("title"))
+            path = target
+
+        job.title = info.get("title", job.title)
+        job.file_path = path
+        job.stage = "already downloaded"
+        job.progress = 1.0
+        return True
+
+    def _select_format(self, job):
+        """(yt-dlp format spec, merge container) for job."""
+        if job.format:
+            # chosen from the format menu, or pinned by a resumed job so its .part files match
+            return job.format, job.container
+
+        if is_audio_only(job.resolution):
+            option = FormatIndex(job.info).audio_option() if job.info is not None else None
+            return (option.format_spec if option else "bestaudio/best"), None
+
+        height = parse_height(job.resolution)
+        if job.info is not None:
+            option = FormatIndex(job.info).select(height)
+            if option:
+                return option.format_spec, option.container
+
+        # no info yet: let yt-dlp choose, still preferring a progressive stream
+        if height is None:
+            return "best", None
+        return (f"best[height={height}]/bestvideo[height={height}]+bestaudio/"
+                f"best[height<={height}]/bestvideo[height<={height}]+bestaudio/best"), None
+
+    @staticmethod
+    def _ffmpeg_available():
+        from yt_dlp.postprocessor.ffmpeg import FFmpegPostProcessor
+
+        return bool(FFmpegPostProcessor.get_versions().get("ffmpeg"))
+
+    def _formats_expired(self, info):
+        # yt-dlp stamps each info dict with its extraction time
+        return time.time() - info.get("epoch", 0) > self.model.FORMAT_URL_TTL
+
+    def _download_info(self, ydl, job):
+        """
+        Download job using the info dict from loading when there is one, so
+        the extractor runs only once per video. Without it, or when its stream
+        URLs are too old to trust, extract and download in a single pass.
+        """
+        from yt_dlp import YoutubeDL
+        from yt_dlp.utils import DownloadError
+
+        if job.info is None or self._formats_expired(job.info):
+            return self._extract_and_download(ydl, job)
+
+        info = YoutubeDL.sanitize_info(job.info, remove_private_keys=True)
+        # yt-dlp works on its own copy; a queued or finished job needn't hold the
+        # whole info dict (a retry extracts again, its stream URLs may be stale)
+        job.info = None
+        try:
+            return ydl.process_ie_result(info, download=True)
+        except DownloadError:
+            if job.cancelled:
+                raise
+            # Format URLs may have expired; fall back to a fresh extraction
+            print(f"Stored info failed for {job.url}, re-extracting")
+            self.metadata_cache.invalidate(job.url)
+            return self._extract_and_download(ydl, job)
+
+    def _extract_and_download(self, ydl, job):
+        from yt_dlp import YoutubeDL
+
+        # two steps on the same instance, only so the extraction can be timed
+        started = time.time()
+        info = ydl.extract_info(job.url, download=False)
+        job.timings["extraction"] = time.time() - started
+        info = YoutubeDL.sanitize_info(info, remove_private_keys=True)
+        self.metadata_cache.put(job.url, info)
+        # first time the video's id is known for a URL-only job
+        if not self._claim_video(job, info) or self._reuse_existing(job, info):
+            raise AlreadyDownloaded()
+        return ydl.process_ie_result(info, download=True)
+
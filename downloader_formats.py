@@ -0,0 +1,145 @@
+import re
+
+# Audio containers that can be stream-copied alongside each video container
+_COMPATIBLE_AUDIO = {
+    "mp4": ("m4a", "mp4"),
+    "webm": ("webm",),
+}
+
+
+AUDIO_ONLY = "Audio only"
+
+
+def _mb(nbytes):
+    return f"~{nbytes / (1024 * 1024):.0f} MB" if nbytes else "size unknown"
+
+
+class FormatOption:
+    """One entry of the resolution menu and the exact yt-dlp formats behind it."""
+
+    def __init__(self, label, format_spec, container, est_size, progressive, height=None, audio_only=False):
+        self.label = label
+        self.format_spec = format_spec   # e.g. "18" or "137+140"
+        self.container = container       # output container; None when no merge is needed
+        self.est_size = est_size         # bytes, None if unknown
+        self.progressive = progressive
+        self.height = height
+        self.audio_only = audio_only
+
+
+class FormatIndex:
+    """
+    Per-video index of info["formats"], built once: codec, container,
+    size and bitrate of each stream, and whether it is progressive
+    (video and audio already muxed). `select` picks the cheapest way to
+    get a resolution: a progressive stream when there is one, otherwise a
+    video+audio pair that can be stream-copied into a common container.
+    """
+
+    def __init__(self, info):
+        self.duration = info.get("duration") or 0
+        self.progressive = []
+        self.video_only = []
+        self.audio_only = []
+
+        for f in info.get("formats") or []:
+            # a codec of None is unknown, not absent (common outside YouTube);
+            # like yt-dlp, count such a format as possibly having that stream
+            vcodec, acodec = f.get("vcodec"), f.get("acodec")
+            has_video = vcodec != "none"
+            has_audio = acodec != "none"
+            if f.get("ext") == "mhtml" or not (has_video or has_audio):
+                continue  # storyboards
+            entry = {
+                "format_id": f["format_id"],
+                "ext": f.get("ext"),
+                "vcodec": vcodec,
+                "acodec": acodec,
+                "height": f.get("height"),
+                "tbr": f.get("tbr") or 0,
+                "size": self._size(f),
+            }
+            if has_video and has_audio:
+                self.progressive.append(entry)
+            elif has_video:
+                self.video_only.append(entry)
+            else:
+                self.audio_only.append(entry)
+
+    def _size(self, f):
+        size = f.get("filesize") or f.get("filesize_approx")
+        if not size and f.get("tbr") and self.duration:
+            size = f["tbr"] * 1000 / 8 * self.duration
+        return int(size) if size else None
+
+    def heights(self):
+        return sorted({e["height"] for e in self.progressive + self.video_only if e["height"]})
+
+    def select(self, height=None):
+        """Best option at height (or the highest available at or below it); None means best overall."""
+        heights = self.heights()
+        if not heights:
+            return None
+        if height is None:
+            height = heights[-1]
+        eligible = [h for h in heights if h <= height] or heights[:1]
+        height = eligible[-1]
+
+        progressive = [e for e in self.progressive if e["height"] == height]
+        if progressive:
+            best = max(progressive, key=lambda e: e["tbr"])
+            return FormatOption(f"{height}p", best["format_id"], None, best["size"], True, height)
+
+        videos = [e for e in self.video_only if e["height"] == height]
+        for container, audio_exts in _COMPATIBLE_AUDIO.items():
+            pair = self._pair([v for v in videos if v["ext"] == container],
+                              [a for a in self.audio_only if a["ext"] in audio_exts])
+            if pair:
+                return self._pair_option(height, pair, container)
+
+        # codecs don't share a container; mkv still takes both without re-encoding
+        pair = self._pair(videos, self.audio_only)
+        if pair:
+            return self._pair_option(height, pair, "mkv")
+        return None
+
+    def audio_option(self):
+        """The best audio-only stream on its own, or None if the video has none."""
+        if not self.audio_only:
+            return None
+        best = max(self.audio_only, key=lambda e: e["tbr"])
+        return FormatOption(AUDIO_ONLY, best["format_id"], None, best["size"], False, audio_only=True)
+
+    def options(self):
+        """Audio only first, if available, then one option per height, lowest first."""
+        audio = self.audio_option()
+        videos = [opt for opt in (self.select(h) for h in self.heights()) if opt]
+        return ([audio] if audio else []) + videos
+
+    @staticmethod
+    def _pair(videos, audios):
+        if not videos or not audios:
+            return None
+        return max(videos, key=lambda e: e["tbr"]), max(audios, key=lambda e: e["tbr"])
+
+    @staticmethod
+    def _pair_option(height, pair, container):
+        video, audio = pair
+        size = video["size"] + audio["size"] if video["size"] and audio["size"] else None
+        return FormatOption(f"{height}p", f"{video['format_id']}+{audio['format_id']}",
+                            container, size, False, height)
+
+
+def menu_label(option):
+    return f"{option.label} ({_mb(option.est_size)})"
+
+
+def is_audio_only(resolution):
+    """'Audio only (~9 MB)' or 'audio' from the CLI."""
+    return str(resolution or "").strip().lower().startswith("audio")
+
+
+def parse_height(resolution):
+    """'720p', '720p (~45 MB)' -> 720; 'original' or anything else -> None."""
+    match = re.match(r"\s*(\d+)p", str(resolution or ""))
+    return int(match.group(1)) if match else None
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Per-job phases, in seconds. Missing phases (e.g. extraction for a video
+# that was already loaded) are left out of the record.
+PHASES = ("queue_wait", "extraction", "ttfb", "transfer", "merge", "total")
+
+
+class Metrics:
+    """
+    Per-job phase timings and process-wide counters.
+
+    Every finished job is appended to `log_path` as one JSON line. The same
+    numbers, summed, are exposed in Prometheus text format by `render`, and
+    over HTTP on localhost by `serve`. Caches registered with `add_cache`
+    are read live for their hit/miss counters.
+    """
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._jobs = Counter()            # status -> finished jobs
+        self._phase_sum = Counter()
+        self._phase_count = Counter()
+        self._bytes = 0
+        self._retries = 0
+        self._recorded_retries = {}       # job id -> job.retries already in _retries
+        self._caches = {}
+        self._server = None
+
+    def add_cache(self, name, cache):
+        """cache needs `hits` and `misses` attributes."""
+        self._caches[name] = cache
+
+    def caches(self):
+        """name -> cache, as registered with add_cache."""
+        return dict(self._caches)
+
+    # -----------------------
+    # Recording
+    # -----------------------
+    def record_job(self, job):
+        record = {
+            "time": round(time.time(), 3),
+            "job": job.id,
+            "url": job.url,
+            "status": job.status,
+            "format": job.format,
+            "bytes": job.bytes_transferred,
+            "retries": job.retries,
+            "timings": {k: round(job.timings[k], 3) for k in PHASES if job.timings.get(k) is not None},
+            "error": job.error,
+        }
+        with self._lock:
+            self._jobs[job.status] += 1
+            self._bytes += job.bytes_transferred
+            # a retried job is recorded again when it finishes; count only the new retries
+            self._retries += job.retries - self._recorded_retries.get(job.id, 0)
+            self._recorded_retries[job.id] = job.retries
+            for phase, seconds in record["timings"].items():
+                self._phase_sum[phase] += seconds
+                self._phase_count[phase] += 1
+            self._write(record)
+
+    def _write(self, record):
+        # called with the lock held
+        if not self.log_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Metrics log write error: {e}")
+
+    # -----------------------
+    # Prometheus text endpoint
+    # -----------------------
+    def render(self):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            # samples: (name suffix, labels, value)
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+
+        with self._lock:
+            phases = [p for p in PHASES if self._phase_count[p]]
+            metric("winbix_jobs_total", "counter", "Finished jobs by final status.",
+                   [("", {"status": s}, n) for s, n in sorted(self._jobs.items())])
+            metric("winbix_bytes_transferred_total", "counter", "Bytes downloaded by finished jobs.",
+                   [("", {}, self._bytes)])
+            metric("winbix_retries_total", "counter", "Jobs re-queued after a network failure or retried by hand.",
+                   [("", {}, self._retries)])
+            metric("winbix_phase_seconds", "summary", "Time spent per job phase.",
+                   [("_sum", {"phase": p}, round(self._phase_sum[p], 3)) for p in phases]
+                   + [("_count", {"phase": p}, self._phase_count[p]) for p in phases])
+
+        caches = sorted(self._caches.items())
+        metric("winbix_cache_hits_total", "counter", "Cache lookups served without the network.",
+               [("", {"cache": name}, cache.hits) for name, cache in caches])
+        metric("winbix_cache_misses_total", "counter", "Cache lookups that had to go to the network.",
+               [("", {"cache": name}, cache.misses) for name, cache in caches])
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve `render()` at http://host:port/metrics from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # no per-scrape console noise
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        return self._server.server_address[1]
@@ -1,20 +1,191 @@
 import os
+import re
+import sqlite3
+import threading
+import time
+
+# "Title [id].ext" and "Title [id] audio.ext", the names yt-dlp gives files
+# under OUTPUT_TEMPLATE and AUDIO_OUTPUT_TEMPLATE; .part files, unmerged
+# "Title [id].f137.mp4" streams and clips don't match
+_ID_IN_FILENAME_RE = re.compile(r"\[([\w-]+)\]( audio)?\.\w+$")
+
 
 class VideoModel:
     DOWNLOAD_DIR = os.path.join(os.path.expanduser("~"), "Downloads")
+    OUTPUT_TEMPLATE = "%(title)s [%(id)s].%(ext)s"   # the id keeps same-titled videos apart
+    # audio-only files are named apart: an Opus stream kept as .webm looks like a video otherwise
+    AUDIO_OUTPUT_TEMPLATE = "%(title)s [%(id)s] audio.%(ext)s"
+    CLIP_OUTPUT_TEMPLATE = "%(title)s [%(id)s] {clip}.%(ext)s"   # {clip} is e.g. "95s-215s"
+    DUPLICATE_POLICY = "skip"           # already-downloaded videos: "skip", "relink" or "redownload"
+    MAX_CONCURRENT_DOWNLOADS = 3
+    METADATA_WORKERS = 4                # parallel extractions when resolving a playlist
+    BATCH_DEFAULT_RESOLUTION = "720p"
+    UI_FRAME_MS = 100   # progress poller interval
+    PREFETCH_DEBOUNCE_MS = 400          # quiet time in the URL field before its metadata is prefetched
+    CONNECTIVITY_PROBE_URL = "https://www.google.com/generate_204"   # only probed while offline
+    FRAGMENT_CONCURRENCY = 4            # DASH/HLS fragments fetched in parallel per job
+    NETWORK_RETRIES = 5                 # re-queues after network errors (1, 2, 4... s apart) before a job fails
+    FINISHED_JOBS_KEPT = 200            # finished jobs the queue still lists; older ones are dropped
+    POSTPROCESS_WORKERS = os.cpu_count() or 2   # concurrent ffmpeg merges/remuxes, separate from downloads
+    BANDWIDTH_LIMIT = None              # global bytes/sec budget, None = unlimited
+    BANDWIDTH_SCHEDULE = []             # [(start_hour, bytes/sec or None)], overrides BANDWIDTH_LIMIT
+
+    # App data (caches, state) lives outside the Downloads folder
+    APP_DIR = os.path.join(os.path.expanduser("~"), ".winbix")
+    METADATA_CACHE_DIR = os.path.join(APP_DIR, "metadata")
+    METADATA_CACHE_TTL = 7 * 24 * 3600   # how long LOAD may reuse cached info
+    METADATA_CACHE_MAX_ENTRIES = 500
+    FORMAT_URL_TTL = 4 * 3600            # stream URLs expire; refresh older info before downloading
+    THUMB_CACHE_DIR = os.path.join(APP_DIR, "thumbnails")
+    THUMB_SIZE = (300, 200)
+    THUMB_MEMORY_CACHE_BYTES = 16 * 1024 * 1024
+    SPLASH_CACHE_DIR = os.path.join(APP_DIR, "splash")
+    JOB_STATE_FILE = os.path.join(APP_DIR, "jobs.json")
+    JOB_STATE_SAVE_INTERVAL = 5         # seconds between progress saves of a running job
+    METRICS_LOG = os.path.join(APP_DIR, "metrics.jsonl")   # one JSON line of phase timings per finished job
+    METRICS_PORT = None                 # serve Prometheus-style metrics on 127.0.0.1:<port>, None = off
+    HISTORY_DB = os.path.join(APP_DIR, "history.db")
+    USE_DAEMON = True                   # the window attaches to (or starts) the shared download daemon
+    DAEMON_PORT = 47615                 # 127.0.0.1 only
+    DAEMON_STATE_FILE = os.path.join(APP_DIR, "daemon.json")   # port and access token of the running daemon
+    DAEMON_LOG = os.path.join(APP_DIR, "daemon.log")
+    HISTORY_VISIBLE_ROWS = 8            # rows the history popup actually renders
+    QUEUE_VISIBLE_ROWS = 6              # rows the queue popup actually renders
 
     def __init__(self):
         if not os.path.exists(self.DOWNLOAD_DIR):
             os.makedirs(self.DOWNLOAD_DIR)
-        self.download_history = [] 
-
-    def add_to_history(self, path):
-        self.download_history.insert(0, path)
-        if len(self.download_history) > 10:
-            self.download_history.pop()
-        
-    def get_history(self):
-        return self.download_history
-     
+        os.makedirs(self.APP_DIR, exist_ok=True)
+
+        # Download history, kept in SQLite so it survives restarts and scales
+        # to tens of thousands of rows; written from worker threads
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(self.HISTORY_DB, check_same_thread=False, timeout=10)
+        with self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY,
+                    video_id TEXT,              -- index id, "<id>:audio" for audio-only
+                    title TEXT,
+                    path TEXT NOT NULL,
+                    downloaded_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_history_video_id ON history(video_id);
+                CREATE INDEX IF NOT EXISTS idx_history_downloaded_at ON history(downloaded_at);
+                CREATE INDEX IF NOT EXISTS idx_history_path ON history(path);
+
+                -- one row per downloaded video, like yt-dlp's download archive;
+                -- extractor is '' for files found by a folder rescan and
+                -- audio-only downloads are stored as '<id>:audio'
+                CREATE TABLE IF NOT EXISTS downloads (
+                    extractor TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    format TEXT,
+                    downloaded_at REAL NOT NULL,
+                    PRIMARY KEY (extractor, video_id)
+                );
+            """)
+
+    def add_to_history(self, path, video_id=None, title=None):
+        title = title or os.path.splitext(os.path.basename(path))[0]
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT INTO history (video_id, title, path, downloaded_at) VALUES (?, ?, ?, ?)",
+                (video_id, title, path, time.time()),
+            )
+
+    def get_history(self, search=None, offset=0, limit=50):
+        """Newest first. Returns (id, title, path, downloaded_at) rows."""
+        where, params = self._history_filter(search)
+        with self._db_lock:
+            return self._db.execute(
+                f"SELECT id, title, path, downloaded_at FROM history {where} "
+                "ORDER BY downloaded_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+
+    def count_history(self, search=None):
+        where, params = self._history_filter(search)
+        with self._db_lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM history {where}", params).fetchone()[0]
+
     def reset_history(self):
-        self.download_history.clear()
+        with self._db_lock, self._db:
+            self._db.execute("DELETE FROM history")
+
+    # -----------------------
+    # Downloaded-video index
+    # -----------------------
+    def find_download(self, extractor, video_id):
+        """Path of an earlier download of this video, or None."""
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT path FROM downloads WHERE video_id = ? AND extractor IN (?, '') "
+                "ORDER BY extractor DESC LIMIT 1",
+                (video_id, extractor),
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_download(self, extractor, video_id, path, format=None):
+        with self._db_lock, self._db:
+            # a rescanned entry for the same id is superseded by the exact one
+            self._db.execute("DELETE FROM downloads WHERE extractor = '' AND video_id = ?", (video_id,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO downloads (extractor, video_id, path, format, downloaded_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (extractor, video_id, path, format, time.time()),
+            )
+
+    def forget_download(self, extractor, video_id):
+        with self._db_lock, self._db:
+            self._db.execute("DELETE FROM downloads WHERE video_id = ? AND extractor IN (?, '')",
+                             (video_id, extractor))
+
+    def rebuild_download_index(self, folder=None):
+        """
+        Re-sync the index with what is on disk: drop entries whose file is
+        gone, then add files named "... [id].ext" in folder and history rows
+        whose file still exists. Returns the number of indexed videos.
+        """
+        folder = folder or self.DOWNLOAD_DIR
+        found = {}
+        with self._db_lock:
+            # video_id is the index id, "<id>:audio" for audio-only downloads
+            for path, video_id in self._db.execute(
+                    "SELECT path, video_id FROM history WHERE video_id IS NOT NULL ORDER BY downloaded_at"):
+                found[video_id] = path
+            indexed = self._db.execute("SELECT extractor, video_id, path FROM downloads").fetchall()
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            names = []
+        for name in names:
+            match = _ID_IN_FILENAME_RE.search(name)
+            if match:
+                video_id = f"{match.group(1)}:audio" if match.group(2) else match.group(1)
+                found[video_id] = os.path.join(folder, name)
+
+        with self._db_lock, self._db:
+            known = set()
+            for extractor, video_id, path in indexed:
+                if os.path.exists(path):
+                    known.add(video_id)
+                else:
+                    self._db.execute("DELETE FROM downloads WHERE extractor = ? AND video_id = ?",
+                                     (extractor, video_id))
+            for video_id, path in found.items():
+                if video_id not in known and os.path.exists(path):
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO downloads (extractor, video_id, path, format, downloaded_at) "
+                        "VALUES ('', ?, ?, NULL, ?)",
+                        (video_id, path, os.path.getmtime(path)),
+                    )
+            return self._db.execute("SELECT COUNT(*) FROM downloads").fetchone()[0]
+
+    @staticmethod
+    def _history_filter(search):
+        if not search:
+            return "", []
+        pattern = f"%{search}%"
+        return "WHERE title LIKE ? OR path LIKE ?", [pattern, pattern]
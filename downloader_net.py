@@ -0,0 +1,121 @@
+import threading
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Shared keep-alive requests session, so repeated requests to a host reuse one connection."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+# Exception class names (anywhere in the MRO) that mean "could not reach the
+# network" rather than "the server said no". Matched by name so requests and
+# yt_dlp do not have to be imported just to classify an error.
+_NETWORK_ERROR_NAMES = {
+    "ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout", "TimeoutError",
+    "TransportError", "URLError", "gaierror", "timeout",
+}
+
+
+def is_network_error(exc):
+    """True if exc, or anything it wraps, is a connectivity failure."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if any(cls.__name__ in _NETWORK_ERROR_NAMES for cls in type(exc).__mro__):
+            return True
+        # yt-dlp keeps the original error in exc_info (DownloadError) or cause (ExtractorError)
+        exc_info = getattr(exc, "exc_info", None)
+        wrapped = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None
+        exc = exc.__cause__ or wrapped or getattr(exc, "cause", None) or exc.__context__
+        if not isinstance(exc, BaseException):
+            exc = None
+    return False
+
+
+class ConnectivityMonitor:
+    """
+    Connectivity inferred from real traffic. Callers report the outcome of
+    their requests; after a network failure the monitor goes offline and
+    probes `probe_url` with a HEAD request on the shared session, backing
+    off exponentially until one succeeds. Nothing is probed while online.
+    """
+
+    def __init__(self, probe_url, min_backoff=1.0, max_backoff=60.0):
+        self.probe_url = probe_url
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self._online = threading.Event()
+        self._online.set()
+        self._lock = threading.Lock()
+        self._prober = None
+        self._listeners = []
+
+    @property
+    def online(self):
+        return self._online.is_set()
+
+    def add_listener(self, fn):
+        """fn(online) is called from whichever thread saw the state change."""
+        self._listeners.append(fn)
+
+    def wait_online(self, timeout=None):
+        return self._online.wait(timeout)
+
+    def report_success(self):
+        if not self._online.is_set():
+            self._set_online(True)
+
+    def report_failure(self, exc):
+        """Record a failed request. Returns True if it was a connectivity failure."""
+        if not is_network_error(exc):
+            return False
+        if self._online.is_set():
+            self._set_online(False)
+        return True
+
+    def _set_online(self, online):
+        with self._lock:
+            if online == self._online.is_set():
+                return
+            if online:
+                self._online.set()
+            else:
+                self._online.clear()
+                if self._prober is None or not self._prober.is_alive():
+                    self._prober = threading.Thread(target=self._probe_loop, name="connectivity-probe", daemon=True)
+                    self._prober.start()
+        for fn in list(self._listeners):
+            try:
+                fn(online)
+            except Exception as e:
+                print(f"Connectivity listener error: {e}")
+
+    def _probe_loop(self):
+        delay = self.min_backoff
+        while not self._online.is_set():
+            # wakes early if real traffic already reported success
+            if self._online.wait(delay):
+                return
+            if self.probe():
+                self._set_online(True)
+                return
+            delay = min(delay * 2, self.max_backoff)
+
+    def probe(self):
+        try:
+            get_session().head(self.probe_url, timeout=3, allow_redirects=False)
+            return True
+        except Exception:
+            return False
@@ -0,0 +1,283 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+
+class DownloadJob:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    # Everything a front end may render; sent to daemon clients by to_dict
+    PUBLIC_FIELDS = ("id", "url", "resolution", "title", "status", "stage", "progress", "downloaded_bytes",
+                     "bytes_transferred", "total_bytes", "speed", "eta", "file_path", "error", "priority",
+                     "format", "clip", "hook_calls", "retries", "timings")
+
+    _ids = itertools.count(1)
+
+    def __init__(self, url, resolution, title=None, info=None):
+        self.id = next(self._ids)
+        self.url = url
+        self.resolution = resolution
+        # Extracted info dict, if the video was already loaded
+        self.info = info
+        self.title = title or (info or {}).get("title") or url
+        # Pinned once the download starts, so a resumed job picks up its .part files
+        self.format = None
+        self.container = None   # merge_output_format for video+audio pairs
+        self.output_path = None
+        # Higher priority jobs are served first by the bandwidth scheduler
+        self.priority = 0
+        # "skip", "relink" or "redownload" if already downloaded; None = the model's default
+        self.on_duplicate = None
+        # (start, end) seconds to fetch instead of the whole video; end None = to the end
+        self.clip = None
+        self.precise_cuts = False   # re-encode at the cuts instead of snapping to keyframes
+        self.video_key = None   # archive key, once known; no two active jobs download the same one
+        self.retries = 0   # network re-queues and manual retries
+        self.cancel_event = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        self.status = self.QUEUED
+        # Written by the download thread's progress hook, read by the UI poller
+        self.stage = "queued"
+        self.progress = 0.0
+        self.downloaded_bytes = 0
+        self.bytes_transferred = 0   # received by this attempt, completed streams only
+        self.total_bytes = None
+        self.speed = 0
+        self.eta = None
+        self.file_path = None
+        self.error = None
+        self.hook_calls = 0
+        self.network_retries = 0   # automatic re-queues of this attempt, capped by the queue
+        # phase -> seconds for the current attempt, see downloader_metrics.PHASES
+        self.timings = {}
+        self.queued_at = time.time()
+        self.started_at = None
+        self.cancel_event.clear()
+
+    @property
+    def is_active(self):
+        return self.status in (self.QUEUED, self.RUNNING)
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def to_state(self):
+        return {
+            "url": self.url,
+            "resolution": self.resolution,
+            "title": self.title,
+            "format": self.format,
+            "container": self.container,
+            "output_path": self.output_path,
+            "priority": self.priority,
+            "on_duplicate": self.on_duplicate,
+            "clip": self.clip,
+            "precise_cuts": self.precise_cuts,
+            "bytes_done": self.bytes_transferred + self.downloaded_bytes,
+        }
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.PUBLIC_FIELDS}
+
+    @classmethod
+    def from_state(cls, state):
+        job = cls(state["url"], state["resolution"], state.get("title"))
+        job.format = state.get("format")
+        job.container = state.get("container")
+        job.output_path = state.get("output_path")
+        job.priority = state.get("priority", 0)
+        job.on_duplicate = state.get("on_duplicate")
+        job.clip = tuple(state["clip"]) if state.get("clip") else None
+        job.precise_cuts = state.get("precise_cuts", False)
+        return job
+
+
+class DownloadQueue:
+    """
+    FIFO of DownloadJobs drained by a fixed pool of worker threads.
+    `runner(job)` does the actual transfer and raises on failure. It may
+    return a callable for the job's CPU-bound post-processing (merging,
+    remuxing, tagging); that runs on a separate, smaller pool so the
+    download worker can move on to the next job straight away.
+
+    With a ConnectivityMonitor, workers hold jobs while offline and a job
+    that fails for lack of network goes back in the queue instead of failing,
+    after a growing delay and at most `network_retries` times per attempt.
+
+    Only the latest `max_finished` finished jobs are kept in `jobs`, so a
+    long-running queue doesn't grow without bound.
+    """
+
+    def __init__(self, runner, workers=3, on_change=None, connectivity=None, postprocess_workers=1,
+                 network_retries=5, max_finished=200):
+        self._runner = runner
+        self._network_retries = network_retries
+        self._max_finished = max_finished
+        self._on_change = on_change
+        self._connectivity = connectivity
+        self._queue = queue.Queue()
+        self._postprocess_queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.jobs = []
+
+        for i in range(max(1, workers)):
+            t = threading.Thread(target=self._worker, name=f"download-worker-{i}", daemon=True)
+            t.start()
+        for i in range(max(1, postprocess_workers)):
+            t = threading.Thread(target=self._postprocess_worker, name=f"postprocess-worker-{i}", daemon=True)
+            t.start()
+
+    # -----------------------
+    # Public API
+    # -----------------------
+    def submit(self, url, resolution, title=None, info=None):
+        return self.add(DownloadJob(url, resolution, title, info))
+
+    def add(self, job):
+        with self._lock:
+            self.jobs.append(job)
+            finished = [j.id for j in self.jobs if not j.is_active]
+            if len(finished) > self._max_finished:
+                dropped = set(finished[:len(finished) - self._max_finished])
+                self.jobs = [j for j in self.jobs if j.id not in dropped]
+        self._queue.put(job)
+        self._changed(job)
+        return job
+
+    def cancel(self, job):
+        if not job.is_active:
+            return
+        job.cancel_event.set()
+        with self._lock:
+            # never picked up by a worker, so finish it right here
+            cancelled = job.status == DownloadJob.QUEUED
+            if cancelled:
+                job.status = DownloadJob.CANCELLED
+        if cancelled:
+            self._changed(job)
+
+    def retry(self, job):
+        with self._lock:
+            if job.is_active:
+                return
+            job._reset()
+            job.retries += 1
+        self._queue.put(job)
+        self._changed(job)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.jobs)
+
+    # -----------------------
+    # Workers
+    # -----------------------
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if self._connectivity:
+                    self._connectivity.wait_online()
+                with self._lock:
+                    # a job cancelled and retried while queued is in the queue twice;
+                    # only the first worker to get here may run it
+                    if job.status != DownloadJob.QUEUED:
+                        continue  # cancelled while waiting, or already taken
+                    job.status = DownloadJob.RUNNING
+                job.started_at = time.time()
+                job.timings = {"queue_wait": job.started_at - job.queued_at}
+                self._changed(job)
+                try:
+                    finish = self._runner(job)
+                    if self._connectivity:
+                        self._connectivity.report_success()
+                    if finish is not None:
+                        # still RUNNING until the post-processing pool is done with it
+                        job.stage = "processing"
+                        self._postprocess_queue.put((job, finish))
+                        continue
+                    job.status = DownloadJob.DONE
+                except Exception as e:
+                    if job.cancelled:
+                        job.status = DownloadJob.CANCELLED
+                    elif (self._connectivity and self._connectivity.report_failure(e)
+                          and job.network_retries < self._network_retries):
+                        # resumes from its .part file; the delay keeps a host that fails
+                        # while the probe answers from being hammered
+                        delay = min(2 ** job.network_retries, 60)
+                        job.status = DownloadJob.QUEUED
+                        job.stage = "waiting for connection"
+                        job.retries += 1
+                        job.network_retries += 1
+                        job.queued_at = time.time()
+                        timer = threading.Timer(delay, self._queue.put, (job,))
+                        timer.daemon = True
+                        timer.start()
+                    else:
+                        job.status = DownloadJob.FAILED
+                        job.error = str(e)
+                self._changed(job)
+            finally:
+                self._queue.task_done()
+
+    def _postprocess_worker(self):
+        while True:
+            job, finish = self._postprocess_queue.get()
+            try:
+                finish()
+                job.status = DownloadJob.DONE
+            except Exception as e:
+                job.status = DownloadJob.FAILED
+                job.error = str(e)
+            finally:
+                self._postprocess_queue.task_done()
+            self._changed(job)
+
+    def _changed(self, job):
+        if not job.is_active and job.started_at and "total" not in job.timings:
+            job.timings["total"] = time.time() - job.started_at
+        if self._on_change:
+            try:
+                self._on_change(job)
+            except Exception as e:
+                print(f"Queue callback error: {e}")
+
+
+class JobStore:
+    """
+    Unfinished jobs saved as JSON, so they can be re-queued on the next
+    launch and resume from their .part files.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def save(self, jobs):
+        states = [job.to_state() for job in jobs if job.is_active]
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(states, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Job state write error: {e}")
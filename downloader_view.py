@@ -1,5 +1,4 @@
 import customtkinter as ctk
-from PIL import Image, ImageTk
 
 ctk.set_widget_scaling(1.0)
 ctk.set_window_scaling(1.0)
@@ -50,6 +49,20 @@ class VideoView:
         self.res_menu = ctk.CTkOptionMenu(self.frame, values="select", variable=self.res_var)
         self.res_menu.place(relx=0.1, rely=0.7, relwidth=0.2)
 
+        # Clip: only this part of the video is fetched; both empty = whole video
+        self.clip_start = ctk.CTkEntry(self.frame, placeholder_text="Start", fg_color="#000000",
+                                       bg_color="#FFFCEF", corner_radius=10, text_color="white")
+        self.clip_start.place(relx=0.31, rely=0.7, relwidth=0.08)
+        self.clip_end = ctk.CTkEntry(self.frame, placeholder_text="End", fg_color="#000000",
+                                     bg_color="#FFFCEF", corner_radius=10, text_color="white")
+        self.clip_end.place(relx=0.395, rely=0.7, relwidth=0.08)
+        self.precise_cuts_var = ctk.BooleanVar(value=False)
+        self.precise_cuts_box = ctk.CTkCheckBox(self.frame, text="Exact cuts (re-encode)", text_color="black",
+                                                variable=self.precise_cuts_var, bg_color="#FFFCEF",
+                                                checkbox_width=16, checkbox_height=16,
+                                                font=ctk.CTkFont(size=11))
+        self.precise_cuts_box.place(relx=0.31, rely=0.755)
+
         # Progress & labels
         self.progress_bar = ctk.CTkProgressBar(self.frame, width=300, height=20, progress_color="#5C899D")
         self.progress_bar.place(relx=0.1, rely=0.8, relwidth=0.8, relheight=0.05)
@@ -64,34 +77,60 @@ class VideoView:
                                           font=ctk.CTkFont(size=11))
         self.details_label.place(relx=0.1, rely=0.87, relwidth=0.8, relheight=0.06)
 
-        # History Button
-        self.history_btn = ctk.CTkButton(root, text="Download History", width=630, height=40, corner_radius=20,fg_color="black")
-        self.history_btn.pack(side="bottom", pady=40)
-    
-    # Popup message
-    def show_message(self, title, message):
-        popup = ctk.CTkToplevel(self.root)
-        popup.title(title)
-        popup.transient(self.root)
-        popup.grab_set()
-        popup.configure(fg_color="#110F0F",)
-        popup.attributes("-alpha", 0.9)
+        # History & Queue Buttons
+        self.bottom_bar = ctk.CTkFrame(root, fg_color="transparent")
+        self.bottom_bar.pack(side="bottom", pady=40)
 
-        # Center
+        self.history_btn = ctk.CTkButton(self.bottom_bar, text="Download History", width=310, height=40, corner_radius=20,fg_color="black")
+        self.history_btn.pack(side="left", padx=(0, 5))
+
+        self.queue_btn = ctk.CTkButton(self.bottom_bar, text="Download Queue", width=310, height=40, corner_radius=20,fg_color="black")
+        self.queue_btn.pack(side="left", padx=(5, 0))
+    
+    # Size a popup and center it on the window
+    def center(self, popup, popup_w, popup_h):
         self.root.update_idletasks()
         root_x, root_y = self.root.winfo_x(), self.root.winfo_y()
         root_w, root_h = self.root.winfo_width(), self.root.winfo_height()
-        popup_w, popup_h = 420, 170
         pos_x = root_x + (root_w // 2) - (popup_w // 2)
         pos_y = root_y + (root_h // 2) - (popup_h // 2)
         popup.geometry(f"{popup_w}x{popup_h}+{pos_x}+{pos_y}")
 
+    # Modal popup centered on the window, with a title and a message
+    def _popup(self, title, message, popup_w=420, popup_h=170):
+        popup = ctk.CTkToplevel(self.root)
+        popup.title(title)
+        popup.transient(self.root)
+        popup.grab_set()
+        popup.configure(fg_color="#110F0F",)
+        popup.attributes("-alpha", 0.9)
+        self.center(popup, popup_w, popup_h)
+
         lbl = ctk.CTkLabel(popup, text=title, font=ctk.CTkFont(size=16, weight="bold"))
         lbl.place(relx=0.05, rely=0.08, relwidth=0.9, relheight=0.22)
 
-        msg_lbl = ctk.CTkLabel(popup, text=message, wraplength=380, justify="left",text_color="white")
+        msg_lbl = ctk.CTkLabel(popup, text=message, wraplength=popup_w - 40, justify="left",text_color="white")
         msg_lbl.place(relx=0.05, rely=0.32, relwidth=0.9, relheight=0.4)
+        return popup
+
+    # Popup message
+    def show_message(self, title, message):
+        popup = self._popup(title, message)
 
         ok_btn = ctk.CTkButton(popup, text="OK", command=popup.destroy,
                                fg_color="#ffcc00", text_color="black")
-        ok_btn.place(relx=0.38, rely=0.76, relwidth=0.24, relheight=0.14)
\ No newline at end of file
+        ok_btn.place(relx=0.38, rely=0.76, relwidth=0.24, relheight=0.14)
+
+    # Popup with a few choices; on_choice(choice) runs when one is clicked, not on close
+    def ask_choice(self, title, message, choices, on_choice):
+        popup = self._popup(title, message, popup_w=max(420, 120 * len(choices)), popup_h=190)
+
+        def choose(choice):
+            popup.destroy()
+            on_choice(choice)
+
+        width = 0.9 / len(choices)
+        for i, choice in enumerate(choices):
+            btn = ctk.CTkButton(popup, text=choice, command=lambda c=choice: choose(c),
+                                fg_color="#ffcc00" if i == 0 else "black", text_color="black" if i == 0 else "white")
+            btn.place(relx=0.05 + i * width + 0.01, rely=0.76, relwidth=width - 0.02, relheight=0.14)
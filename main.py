@@ -1,7 +1,8 @@
+import threading
 import customtkinter as ctk
 from downloader_model import VideoModel
 from downloader_view import VideoView
-from downloader_controller import VideoController
+from downloader_controller import VideoController, warm_imports
 from splash import show_splash  # Import splash overlay
 
 if __name__ == "__main__":
@@ -11,7 +12,10 @@ if __name__ == "__main__":
     model = VideoModel()
     view = VideoView(root)
     controller = VideoController(model, view)
-    show_splash(root, "images/splash.gif", duration=3000)
+    show_splash(root, "images/splash.gif", duration=3000, cache_dir=model.SPLASH_CACHE_DIR)
+
+    # Load yt_dlp & co. in the background once the window is up
+    root.after_idle(lambda: threading.Thread(target=warm_imports, daemon=True).start())
    
     
 
@@ -1,9 +1,118 @@
 # splash.py
+import os
+import queue
+import threading
 import tkinter as tk
-from itertools import count
-from PIL import Image, ImageTk, ImageSequence
 
-def show_splash(root, gif_path="images/splash.gif", duration=3000):
+SPLASH_SIZE = (850, 950)
+
+
+def _frame_cache_dir(gif_path, cache_dir):
+    # Invalidate the cache whenever the GIF or the target size changes
+    st = os.stat(gif_path)
+    key = f"{os.path.splitext(os.path.basename(gif_path))[0]}-{st.st_size}-{int(st.st_mtime)}-{SPLASH_SIZE[0]}x{SPLASH_SIZE[1]}"
+    return os.path.join(cache_dir, key)
+
+
+class _FrameSource:
+    """
+    Yields splash frames one at a time. A background thread produces them:
+    pre-resized PNGs left by earlier runs are used as they are, missing ones
+    are decoded, resized and written to the cache there. The Tk thread only
+    turns ready frames into PhotoImages, so a cold cache never stalls it.
+    """
+
+    def __init__(self, gif_path, cache_dir):
+        self.gif_path = gif_path
+        self.frames = []
+        self.done = False
+        self._cache_dir = _frame_cache_dir(gif_path, cache_dir) if cache_dir else None
+        # (PNG path or PIL image) per frame, None once the GIF is exhausted; small, so the
+        # thread stays only a few frames ahead of the animation
+        self._ready = queue.Queue(maxsize=4)
+        self._stop = threading.Event()
+        threading.Thread(target=self._produce, name="splash-frames", daemon=True).start()
+
+    def _frame_path(self, index):
+        return os.path.join(self._cache_dir, f"frame_{index:03d}.png")
+
+    def next_frame(self):
+        """Add one more frame if the thread has one ready; returns False once every frame is loaded."""
+        if self.done:
+            return False
+        try:
+            item = self._ready.get_nowait()
+        except queue.Empty:
+            return True
+        if item is None:
+            self.done = True
+            return False
+        if isinstance(item, str):
+            self.frames.append(tk.PhotoImage(file=item))
+        else:
+            from PIL import ImageTk
+            self.frames.append(ImageTk.PhotoImage(item))
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _frame_count(self):
+        try:
+            with open(os.path.join(self._cache_dir, "complete"), "r") as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _produce(self):
+        gif = None
+        count = self._frame_count() if self._cache_dir else None
+        index = 0
+        try:
+            while count is None or index < count:
+                path = self._frame_path(index) if self._cache_dir else None
+                if path and os.path.exists(path):
+                    item = path  # written by an earlier run, even one that never reached the end
+                else:
+                    from PIL import Image
+
+                    if gif is None:
+                        gif = Image.open(self.gif_path)
+                        if self._cache_dir:
+                            os.makedirs(self._cache_dir, exist_ok=True)
+                    try:
+                        gif.seek(index)
+                    except EOFError:
+                        if self._cache_dir:
+                            with open(os.path.join(self._cache_dir, "complete"), "w") as f:
+                                f.write(str(index))
+                        break
+                    item = gif.convert('RGBA').resize(SPLASH_SIZE, Image.LANCZOS)
+                    if path:
+                        try:
+                            # fast compression: the cache is read once per launch, written once
+                            item.save(f"{path}.tmp", "PNG", compress_level=1)
+                            os.replace(f"{path}.tmp", path)
+                        except OSError:
+                            self._cache_dir = None
+                if not self._put(item):
+                    return
+                index += 1
+        except Exception as e:
+            print(f"Splash frames error: {e}")
+        self._put(None)
+
+
+def show_splash(root, gif_path="images/splash.gif", duration=3000, cache_dir=None):
     """
     Show splash inside the given CTk window (root)
     """
@@ -11,21 +120,20 @@ def show_splash(root, gif_path="images/splash.gif", duration=3000):
     overlay = tk.Label(root, bg='white')
     overlay.place(relx=0, rely=0, relwidth=1, relheight=1)
 
-    # Load GIF frames
-    gif = Image.open(gif_path)
-    frames = []
-    for frame in ImageSequence.Iterator(gif):
-        frame = frame.convert('RGBA')
-        frame = frame.resize((850,950), Image.LANCZOS)
-        frames.append(ImageTk.PhotoImage(frame))
-
-    frame_count = len(frames)
+    source = _FrameSource(gif_path, cache_dir)
+    state = {"index": 0, "after_id": None}
 
-    # Animate GIF
-    def animate(counter=count()):
-        frame = frames[next(counter) % frame_count]
-        overlay.config(image=frame)
-        root.after(50, animate)
+    # Animate GIF; frames are loaded as the first loop reaches them
+    def animate():
+        if not overlay.winfo_exists():
+            return
+        if not source.done and state["index"] >= len(source.frames):
+            source.next_frame()
+        if source.frames:
+            state["index"] %= len(source.frames)
+            overlay.config(image=source.frames[state["index"]])
+            state["index"] += 1
+        state["after_id"] = root.after(50, animate)
 
     animate()
 
@@ -37,7 +145,12 @@ def show_splash(root, gif_path="images/splash.gif", duration=3000):
             overlay.update()
             root.after(50, lambda: fade_out(alpha))
         else:
+            # stop the animation timer so the splash costs nothing once gone
+            if state["after_id"] is not None:
+                root.after_cancel(state["after_id"])
+            source.stop()
             overlay.destroy()
+            source.frames.clear()
 
     # Start fade out after duration
     root.after(duration, fade_out)